@@ -19,11 +19,13 @@ export PORT=${PORT:-9112}
 export DEBUG=${DEBUG:-false}
 export LOG_LEVEL=${LOG_LEVEL:-INFO}
 export ENVIRONMENT=${ENVIRONMENT:-production}
+export WORKERS=${WORKERS:-2}
 
 echo "📡 服务端口: $PORT (统一Web API + MCP服务)"
 echo "🔧 调试模式: $DEBUG"
 echo "📊 日志级别: $LOG_LEVEL"
 echo "🌍 运行环境: $ENVIRONMENT"
+echo "⚙️ worker进程数: $WORKERS"
 echo "🌐 Web界面: http://localhost:$PORT/version-compare"
 echo "🔗 MCP SSE端点: http://localhost:$PORT/api/mcp/sse"
 echo "🔗 MCP健康检查: http://localhost:$PORT/api/mcp/health"
@@ -34,5 +36,8 @@ echo "🚀 启动统一服务（Web界面 + API + MCP）..."
 exec uvicorn src.api.main:app \
     --host 0.0.0.0 \
     --port $PORT \
-    --workers 2 \
+    --workers $WORKERS \
+    --loop uvloop \
+    --http httptools \
+    --no-access-log \
     --log-level ${LOG_LEVEL,,} 
\ No newline at end of file
@@ -6,18 +6,18 @@ import sys
 import os
 import uvicorn
 
-# 添加项目根目录到Python路径
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
 if __name__ == '__main__':
     try:
         print("🚀 正在启动版本比较工具 (FastAPI版)...")
         
         port = int(os.getenv('PORT', 9112))
         debug = os.getenv('DEBUG', 'False').lower() == 'true'
+        # 多进程worker与reload互斥，调试模式下固定为单进程
+        workers = 1 if debug else int(os.getenv('WORKERS', 1))
         
         print(f"📡 服务将在端口 {port} 启动")
         print(f"🔧 调试模式: {'开启' if debug else '关闭'}")
+        print(f"⚙️ worker进程数: {workers}")
         print(f"📖 API文档: http://localhost:{port}/docs")
         print("=" * 50)
         
@@ -27,7 +27,13 @@ if __name__ == '__main__':
             host="0.0.0.0",
             port=port,
             reload=debug,
-            log_level="info" if not debug else "debug"
+            workers=workers,
+            # uvloop事件循环 + httptools解析器，降低每个请求的调度开销（uvloop不支持Windows）
+            loop="uvloop" if sys.platform != "win32" else "asyncio",
+            http="httptools",
+            log_level="info" if not debug else "debug",
+            # 关闭逐请求的访问日志，减少高并发下的stdout I/O
+            access_log=debug
         )
         
     except KeyboardInterrupt:
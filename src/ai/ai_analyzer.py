@@ -4,9 +4,13 @@ AI分析服务
 """
 import openai
 import json
+import logging
+from collections import Counter
 from typing import Dict, List, Any, Optional
 import os
 
+logger = logging.getLogger(__name__)
+
 
 class AIVersionAnalyzer:
     """AI版本分析器"""
@@ -15,12 +19,18 @@ class AIVersionAnalyzer:
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         if self.api_key:
             openai.api_key = self.api_key
-            print("✅ AI分析服务已初始化")
+            logger.info("✅ AI分析服务已初始化")
         else:
-            print("⚠️ 未找到OpenAI API密钥，AI分析功能将使用备用方案")
+            logger.warning("⚠️ 未找到OpenAI API密钥，AI分析功能将使用备用方案")
     
-    def analyze_version_changes(self, task_diff_data: Dict[str, Any]) -> Dict[str, Any]:
-        """AI分析版本变更"""
+    def analyze_version_changes(self, task_diff_data: Dict[str, Any], ai_skip_when_empty: bool = True) -> Dict[str, Any]:
+        """
+        AI分析版本变更
+        
+        Args:
+            task_diff_data: task差异数据
+            ai_skip_when_empty: 没有缺失任务时跳过OpenAI调用，直接使用规则分析（结论恒为低风险）
+        """
         missing_tasks = task_diff_data.get('missing_tasks', [])
         existing_tasks = task_diff_data.get('existing_tasks', [])
         total_diff_commits = task_diff_data.get('total_diff_commits', 0)
@@ -34,12 +44,16 @@ class AIVersionAnalyzer:
                 'analysis_method': 'simple'
             }
         
+        # 没有缺失任务时规则分析已能给出结论，不必等待一次LLM往返
+        if not missing_tasks and ai_skip_when_empty:
+            return self._generate_simple_analysis(missing_tasks, existing_tasks, total_diff_commits)
+        
         # 尝试AI分析
         if self.api_key:
             try:
                 return self._ai_analysis(missing_tasks, existing_tasks, total_diff_commits)
             except Exception as e:
-                print(f"⚠️ AI分析失败，使用备用方案: {e}")
+                logger.warning("⚠️ AI分析失败，使用备用方案: %s", e)
                 return self._generate_simple_analysis(missing_tasks, existing_tasks, total_diff_commits)
         else:
             return self._generate_simple_analysis(missing_tasks, existing_tasks, total_diff_commits)
@@ -141,7 +155,7 @@ class AIVersionAnalyzer:
                 raise ValueError("无法找到JSON格式的响应")
                 
         except Exception as e:
-            print(f"⚠️ AI响应解析失败: {e}")
+            logger.warning("⚠️ AI响应解析失败: %s", e)
             # 降级到简单分析
             return self._generate_simple_analysis(missing_tasks, existing_tasks, 0)
     
@@ -189,7 +203,7 @@ class AIVersionAnalyzer:
         ai_analysis = version_comparison.get('ai_analysis', {})
         processing_time = version_comparison.get('processing_time', 0)
         
-        report = f"""# 版本升级分析报告
+        parts = [f"""# 版本升级分析报告
 
 ## 📋 基本信息
 - **源版本**: {from_version}
@@ -210,48 +224,53 @@ class AIVersionAnalyzer:
 
 ## 📋 升级建议
 {ai_analysis.get('recommendation', '无具体建议')}
-"""
+"""]
         
         # 添加关键关注点
         key_concerns = ai_analysis.get('key_concerns', [])
         if key_concerns:
-            report += "\n## ⚠️ 关键关注点\n"
-            for i, concern in enumerate(key_concerns, 1):
-                report += f"{i}. {concern}\n"
+            parts.append("\n## ⚠️ 关键关注点\n")
+            parts.extend(f"{i}. {concern}\n" for i, concern in enumerate(key_concerns, 1))
         
         # 添加缺失任务详情
         if missing_tasks:
-            report += f"\n## 🚨 缺失任务详情 ({len(missing_tasks)}个)\n"
-            for i, task in enumerate(missing_tasks[:20], 1):  # 限制显示数量
-                report += f"{i}. {task}\n"
+            parts.append(f"\n## 🚨 缺失任务详情 ({len(missing_tasks)}个)\n")
+            parts.extend(f"{i}. {task}\n" for i, task in enumerate(missing_tasks[:20], 1))  # 限制显示数量
             if len(missing_tasks) > 20:
-                report += f"... 还有{len(missing_tasks)-20}个任务\n"
+                parts.append(f"... 还有{len(missing_tasks)-20}个任务\n")
         
         # 添加已存在任务（如果数量不多）
         if existing_tasks and len(existing_tasks) <= 10:
-            report += f"\n## ✅ 已存在任务 ({len(existing_tasks)}个)\n"
-            for i, task in enumerate(existing_tasks, 1):
-                report += f"{i}. {task}\n"
+            parts.append(f"\n## ✅ 已存在任务 ({len(existing_tasks)}个)\n")
+            parts.extend(f"{i}. {task}\n" for i, task in enumerate(existing_tasks, 1))
         elif existing_tasks:
-            report += f"\n## ✅ 已存在任务\n共{len(existing_tasks)}个任务在新版本中已存在\n"
+            parts.append(f"\n## ✅ 已存在任务\n共{len(existing_tasks)}个任务在新版本中已存在\n")
         
-        return report
+        # 各段落收集后一次拼接，避免逐行 += 反复复制整份报告
+        return ''.join(parts)
     
     def analyze_multiple_versions(self, version_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """分析多个版本比较的结果"""
         if not version_results:
             return {'summary': '无版本比较数据'}
         
-        total_missing = sum(len(result.get('missing_tasks', [])) for result in version_results)
-        total_existing = sum(len(result.get('existing_tasks', [])) for result in version_results)
-        avg_processing_time = sum(result.get('processing_time', 0) for result in version_results) / len(version_results)
+        # 一次遍历累计任务数、耗时和风险等级分布
+        total_missing = 0
+        total_existing = 0
+        total_processing_time = 0
+        risk_counter = Counter()
+        for result in version_results:
+            total_missing += len(result.get('missing_tasks', []))
+            total_existing += len(result.get('existing_tasks', []))
+            total_processing_time += result.get('processing_time', 0)
+            risk_counter[result.get('ai_analysis', {}).get('risk_level', 'unknown')] += 1
+        avg_processing_time = total_processing_time / len(version_results)
         
         # 风险趋势分析
-        risk_levels = [result.get('ai_analysis', {}).get('risk_level', 'unknown') for result in version_results]
         risk_distribution = {
-            'high': risk_levels.count('high'),
-            'medium': risk_levels.count('medium'),
-            'low': risk_levels.count('low')
+            'high': risk_counter['high'],
+            'medium': risk_counter['medium'],
+            'low': risk_counter['low']
         }
         
         return {
@@ -5,47 +5,73 @@
 基于FastAPI的高性能版本比较服务，支持多项目配置
 """
 import os
-import sys
 import time
+import atexit
+import queue
 import logging
-from typing import Dict, Any, List, Optional
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from fastapi import FastAPI, HTTPException, Query, Path, Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from dotenv import load_dotenv
+import re
 import json
 import asyncio
+import functools
+import itertools
+import threading
 
 # MCP 相关导入
-from mcp.server.models import InitializationOptions
-from mcp.server import NotificationOptions, Server
+from mcp.server import Server
 from mcp.server.sse import SseServerTransport
 from mcp import types
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 
-# 添加项目根目录到Python路径
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# 优先使用orjson序列化响应（C实现，比标准库json快数倍），未安装时回退到标准JSONResponse
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:
+    orjson = None
+    DefaultJSONResponse = JSONResponse
 
 # 导入版本比较服务
-from src.services.version_service import VersionComparisonService
-
-# 加载环境变量
-load_dotenv()
-
-# 配置日志
+from src.services.version_service import VersionComparisonService, load_projects_config
+from src.core.cache_manager import TTLCache
+
+# 加载环境变量；容器部署时环境变量已由编排注入，可设置 MCP_SKIP_DOTENV=1 跳过 .env 文件查找
+if os.getenv("MCP_SKIP_DOTENV") != "1":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+# 配置日志：级别由 LOG_LEVEL 环境变量控制（默认WARNING）；
+# 请求处理线程只把日志记录放入队列，写stderr由 QueueListener 的后台线程完成
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
+_log_queue_handler = QueueHandler(_log_queue)
+# 入队前只合并消息参数，完整格式由后台线程的StreamHandler统一添加
+_log_queue_handler.setFormatter(logging.Formatter('%(message)s'))
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+    handlers=[_log_queue_handler]
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # 创建FastAPI应用
 app = FastAPI(
     title="版本比较工具 API",
     description="基于GitLab的高性能版本比较和task分析工具，支持多项目配置",
-    version="2.1.0"
+    version="2.1.0",
+    default_response_class=DefaultJSONResponse
 )
 
 # 添加CORS中间件
@@ -57,81 +83,327 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class SSEAwareGZipMiddleware:
+    """
+    对普通响应启用gzip压缩；MCP相关路径（SSE流式响应）跳过压缩，
+    并声明禁止反向代理缓冲，保证事件实时推送
+    """
+    
+    def __init__(self, app: ASGIApp, minimum_size: int = 512, skip_prefix: str = "/api/mcp/"):
+        self.app = app
+        self.gzip_app = GZipMiddleware(app, minimum_size=minimum_size)
+        self.skip_prefix = skip_prefix
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.skip_prefix):
+            await self.gzip_app(scope, receive, send)
+            return
+        
+        async def send_without_buffering(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.setdefault("Cache-Control", "no-cache")
+                headers["X-Accel-Buffering"] = "no"
+            await send(message)
+        
+        await self.app(scope, receive, send_without_buffering)
+
+
+# 添加gzip压缩中间件（分析结果JSON通常有几十KB，压缩收益明显）
+app.add_middleware(SSEAwareGZipMiddleware, minimum_size=512)
+
 # 挂载静态文件服务 - 为前端静态资源提供服务
 app.mount("/static", StaticFiles(directory="."), name="static")
 
 # 全局服务实例缓存
 version_services: Dict[str, VersionComparisonService] = {}
+# 默认项目key，在默认服务创建后设置，MCP调用未指定项目时直接使用
+_default_project_key: Optional[str] = None
+# 按项目划分的服务创建锁，避免并发的首次调用重复创建同一项目的服务；只为配置文件中存在的项目创建
+_service_locks: Dict[str, asyncio.Lock] = {}
+# 服务注册表写锁：REST接口与MCP工具可能在不同线程中首次创建服务，保证每个项目只创建一个实例
+_services_lock = threading.Lock()
 
 # 创建MCP服务器实例
 mcp_server = Server("version-compare-tool")
 sse_transport = SseServerTransport("/api/mcp/messages/")
 
+# 进行中的分析请求（singleflight），key: (工具名, 项目key, 旧版本, 新版本, 条目上限)
+_inflight: Dict[Tuple[str, str, str, str, Optional[int]], asyncio.Task] = {}
+
+# 已构建好的MCP工具响应的短期缓存，LLM重试等重复调用直接返回，不再分析和序列化。
+# key在请求key之外还包含两个版本当前解析到的commit SHA，分支移动后不会返回旧的分析结果；MCP_RESULT_TTL=0 时禁用
+MCP_RESULT_TTL = float(os.getenv("MCP_RESULT_TTL", 600))
+_tool_response_cache: Optional[TTLCache] = TTLCache(maxsize=256, ttl=MCP_RESULT_TTL) if MCP_RESULT_TTL > 0 else None
+
+# list-supported-projects 响应文本缓存：(项目配置文件的修改时间, 响应文本)
+_projects_response_cache: Optional[Tuple[int, str]] = None
+
+
+# 工具输入参数schema，模块加载时构建一次
+LIST_PROJECTS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {},
+    "required": []
+}
+
+VERSION_TOOL_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "old_version": {
+            "type": "string",
+            "minLength": 1,
+            "description": "旧版本号"
+        },
+        "new_version": {
+            "type": "string",
+            "minLength": 1,
+            "description": "新版本号"
+        },
+        "project": {
+            "type": "string",
+            "description": "项目key (可选，不指定则使用默认项目)",
+            "default": ""
+        },
+        "max_items": {
+            "type": "integer",
+            "minimum": 1,
+            "description": "每个结果列表最多返回的条目数 (可选，不指定则返回全部，响应过大时仍会自动截断)"
+        }
+    },
+    "required": ["old_version", "new_version"]
+}
+
+_TOOL_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "list-supported-projects": LIST_PROJECTS_SCHEMA,
+    "analyze-new-features": VERSION_TOOL_SCHEMA,
+    "detect-missing-tasks": VERSION_TOOL_SCHEMA,
+    "compare-versions": VERSION_TOOL_SCHEMA,
+}
+
+# 预编译参数校验函数（fastjsonschema 为每个schema生成Python校验代码）；未安装时回退到手工校验
+try:
+    import fastjsonschema
+    _TOOL_VALIDATORS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+        name: fastjsonschema.compile(schema) for name, schema in _TOOL_SCHEMAS.items()
+    }
+except ImportError:
+    fastjsonschema = None
+    _TOOL_VALIDATORS = {}
+
+
+# 工具列表在进程生命周期内不变，模块加载时构建一次
+_TOOLS_LIST: List[types.Tool] = [
+    types.Tool(
+        name="list-supported-projects",
+        description="列出所有支持的GitLab项目配置",
+        inputSchema=LIST_PROJECTS_SCHEMA
+    ),
+    types.Tool(
+        name="analyze-new-features",
+        description="分析两个版本之间的新增功能和特性",
+        inputSchema=VERSION_TOOL_SCHEMA
+    ),
+    types.Tool(
+        name="detect-missing-tasks",
+        description="检测两个版本之间缺失的任务和功能",
+        inputSchema=VERSION_TOOL_SCHEMA
+    ),
+    types.Tool(
+        name="compare-versions",
+        description="一次调用同时返回两个版本之间的新增功能和缺失任务（只获取一次GitLab数据）",
+        inputSchema=VERSION_TOOL_SCHEMA
+    )
+]
+
 
 @mcp_server.list_tools()
 async def handle_list_tools() -> List[types.Tool]:
-    """列出可用的工具"""
-    return [
-        types.Tool(
-            name="list-supported-projects",
-            description="列出所有支持的GitLab项目配置",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="analyze-new-features",
-            description="分析两个版本之间的新增功能和特性",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "old_version": {
-                        "type": "string",
-                        "description": "旧版本号"
-                    },
-                    "new_version": {
-                        "type": "string", 
-                        "description": "新版本号"
-                    },
-                    "project": {
-                        "type": "string",
-                        "description": "项目key (可选，不指定则使用默认项目)",
-                        "default": ""
-                    }
-                },
-                "required": ["old_version", "new_version"]
-            }
-        ),
-        types.Tool(
-            name="detect-missing-tasks",
-            description="检测两个版本之间缺失的任务和功能",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "old_version": {
-                        "type": "string",
-                        "description": "旧版本号"
-                    },
-                    "new_version": {
-                        "type": "string",
-                        "description": "新版本号"
-                    },
-                    "project": {
-                        "type": "string",
-                        "description": "项目key (可选，不指定则使用默认项目)",
-                        "default": ""
-                    }
-                },
-                "required": ["old_version", "new_version"]
-            }
-        )
-    ]
+    """列出可用的工具（返回副本，避免框架层修改共享的列表）"""
+    return list(_TOOLS_LIST)
+
+
+# 调试用：MCP_PRETTY_JSON=1 时工具响应以缩进格式输出（体积增加约30%~50%），默认输出紧凑JSON
+MCP_PRETTY_JSON = os.getenv("MCP_PRETTY_JSON", "").lower() in ("1", "true", "yes")
+
+
+def _encode_json(obj: Any) -> str:
+    """
+    紧凑编码JSON（不转义中文），用于响应大小检查和最终输出
+    
+    优先使用orjson（输出与标准库紧凑格式一致），遇到其不支持的类型或未安装时回退到标准库
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+        except TypeError:
+            # orjson 默认不支持非字符串键、超出64位的整数等，交给标准库处理
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _output_json(obj: Any, encoded: str) -> str:
+    """返回最终输出的JSON文本：默认直接使用已有的紧凑编码，开启 MCP_PRETTY_JSON 时按缩进格式重新编码"""
+    if not MCP_PRETTY_JSON:
+        return encoded
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def _append_json_fields(obj: Dict[str, Any], encoded: str, fields: Dict[str, Any]) -> str:
+    """
+    将字段加入dict，并追加到其已编码的JSON末尾，结果与重新编码整个dict一致
+    
+    字段已存在时（位置会不同）回退为重新编码
+    """
+    if any(key in obj for key in fields):
+        obj.update(fields)
+        return _encode_json(obj)
+    obj.update(fields)
+    extra = _encode_json(fields)[1:-1]
+    if encoded == '{}':
+        return '{' + extra + '}'
+    # 一次join完成拼接：链式 + 会为每一步分配一个与大段JSON等长的临时字符串
+    return ''.join((encoded[:-1], ',', extra, '}'))
+
+
+# JSON字符串编码时需要转义的字符：引号、反斜杠和控制字符各多占1个字符（如 \n）
+_JSON_ESCAPE_RE = re.compile(r'["\\\x00-\x1f]')
+# 没有简写形式、编码为 \u00XX 的控制字符，在上面的基础上再多占4个字符
+_JSON_UNICODE_ESCAPE_RE = re.compile(r'[\x00-\x07\x0b\x0e-\x1f]')
+
+
+def _json_string_size(text: str) -> int:
+    """字符串编码为JSON后的字符数（含引号和转义展开）"""
+    size = len(text) + 2
+    if _JSON_ESCAPE_RE.search(text):
+        size += len(_JSON_ESCAPE_RE.findall(text)) + 4 * len(_JSON_UNICODE_ESCAPE_RE.findall(text))
+    return size
+
+
+def _estimate_json_size(obj: Any, budget: int) -> int:
+    """
+    估算对象紧凑JSON编码后的字符数（迭代遍历，不做序列化）
+    
+    计入字符串的转义展开，分隔符按上限计算，结果不小于实际编码长度，可据此跳过序列化检查；
+    估算值超过budget时立即返回，因此对超大数据的开销只与budget相关
+    """
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            size += _json_string_size(item) + 1
+        elif isinstance(item, dict):
+            size += 2
+            for key, value in item.items():
+                size += _json_string_size(str(key)) + 2
+                stack.append(value)
+        elif isinstance(item, (list, tuple, set)):
+            size += 2 + len(item)
+            stack.extend(item)
+        elif isinstance(item, (bool, int, float)) or item is None:
+            # true/false/null 与 repr 等长，数字的JSON表示不长于 repr
+            size += len(repr(item))
+        else:
+            size += 8
+        if size > budget:
+            break
+    return size
+
+
+# 单个响应JSON的绝对上限（32 MiB字符）：按最终输出的实际编码长度检查，截断逻辑失效时拒绝返回，
+# 避免超大响应继续被缓存、拼接和发送
+RESPONSE_HARD_CAP = 32 * 1024 * 1024
+
+
+class ResponseTooLargeError(ValueError):
+    """最终输出的响应JSON超过 RESPONSE_HARD_CAP"""
+    pass
+
+
+def _capped_output_json(obj: Any, encoded: str) -> str:
+    """返回最终输出的JSON文本（同 _output_json），其实际长度超过 RESPONSE_HARD_CAP 时抛出 ResponseTooLargeError"""
+    output = _output_json(obj, encoded)
+    if len(output) > RESPONSE_HARD_CAP:
+        logger.error("❌ 响应JSON长度 %s 字符超过绝对上限 %s 字符，放弃返回", len(output), RESPONSE_HARD_CAP)
+        raise ResponseTooLargeError(f"响应数据超过上限 {RESPONSE_HARD_CAP} 字符，请缩小版本范围或指定 max_items")
+    return output
+
+
+# 截断时原样保留的基本信息字段（按输出顺序）
+_BASIC_FIELDS = ('analysis', 'total_time', 'old_commits_count', 'new_commits_count',
+                 'old_tasks_count', 'new_tasks_count', 'error')
+
+# 截断时简化的详细分析字段: (字段名, 类型, 样本数量)
+# list 类型保留前N个任务ID；dict 类型 {task_id: [commits]} 保留前N个任务及其commit数量
+_DETAILED_FIELDS = (
+    ('completely_new_tasks', 'list', 5),
+    ('partially_new_tasks', 'dict', 3),
+    ('completely_missing_tasks', 'list', 5),
+    ('partially_missing_tasks', 'dict', 3),
+)
+
+# 二次截断时移除的非关键字段
+_NON_ESSENTIAL_FIELDS = ('service_stats',)
+
+# 重复出现时改为引用的最短字符串长度，短字符串（如任务ID）替换后收益不大
+STRING_REF_MIN_LENGTH = 64
+# 改为引用所需的最少出现次数：只出现两次的字符串替换后节省有限，却让数据更难阅读
+STRING_REF_MIN_COUNT = 3
+
+
+def _dedupe_repeated_strings(obj: Any) -> Tuple[Any, List[str]]:
+    """
+    将多次出现的长字符串（如同一条commit message同时出现在多个列表中）替换为 {"$ref": N} 引用
+    
+    引用是对象而不是字符串，不会与字符串值（即使内容形如 "$ref:0"）混淆；
+    字符串表按首次出现的顺序编号
+    
+    Returns:
+        (替换后的新对象（不修改原对象）, 字符串表)，{"$ref": N} 对应字符串表中的第N项；
+        没有可替换的字符串时返回原对象和空表
+    """
+    counts: Dict[str, int] = {}
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            if len(item) >= STRING_REF_MIN_LENGTH:
+                counts[item] = counts.get(item, 0) + 1
+        elif isinstance(item, dict):
+            # 逆序入栈，出栈顺序即文档顺序，counts的插入顺序就是首次出现的顺序
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, (list, tuple)):
+            stack.extend(reversed(item))
+    
+    string_table: List[str] = []
+    refs: Dict[str, Dict[str, int]] = {}
+    for text, count in counts.items():
+        if count >= STRING_REF_MIN_COUNT:
+            refs[text] = {'$ref': len(string_table)}
+            string_table.append(text)
+    if not string_table:
+        return obj, string_table
+    
+    def replace(item: Any) -> Any:
+        if isinstance(item, str):
+            return refs.get(item, item)
+        if isinstance(item, dict):
+            return {key: replace(value) for key, value in item.items()}
+        if isinstance(item, (list, tuple)):
+            return [replace(value) for value in item]
+        return item
+    
+    return replace(obj), string_table
 
 
 # 添加响应截断处理函数
-def truncate_large_response(result: Dict[str, Any], max_chars: int = 130000) -> Dict[str, Any]:
+def truncate_large_response(result: Dict[str, Any], max_chars: int = 130000) -> Tuple[Dict[str, Any], str]:
     """
     截断过大的响应数据，避免超出LLM输入长度限制
     
@@ -140,37 +412,69 @@ def truncate_large_response(result: Dict[str, Any], max_chars: int = 130000) ->
         max_chars: 最大字符数限制（默认130,000字符，留出安全边界）
         
     Returns:
-        截断后的响应数据，包含截断标记
+        (截断后的响应数据（包含截断标记）, 其紧凑JSON编码)
+        调用方直接使用返回的编码文本，不必再次序列化
+    
+    Raises:
+        ResponseTooLargeError: 最终输出的JSON实际长度超过 RESPONSE_HARD_CAP
+    
+    注意: 本函数不做结果缓存。每次分析返回的都是新的dict，按对象身份缓存永远不会命中，
+    且id()在对象回收后会被复用；重复调用的复用由 _tool_response_cache 在最终响应层完成。
     """
-    # 先序列化检查长度
-    full_json = json.dumps(result, ensure_ascii=False)
+    # 先估算大小：估算值远超限制时直接截断，不对完整的原始数据做序列化
+    estimate_budget = max_chars * 2
+    estimated_size = _estimate_json_size(result, estimate_budget)
+    size_estimated = estimated_size > estimate_budget
+    
+    if size_estimated:
+        original_size = estimated_size
+    else:
+        # 序列化检查长度，未超出限制时这份编码就是最终输出
+        full_json = _encode_json(result)
+        original_size = len(full_json)
+        
+        if original_size <= max_chars:
+            # 未超出限制，直接返回
+            encoded = _append_json_fields(result, full_json, {
+                '_response_truncated': False,
+                '_response_size': original_size
+            })
+            return result, _capped_output_json(result, encoded)
     
-    if len(full_json) <= max_chars:
-        # 未超出限制，直接返回
-        result['_response_truncated'] = False
-        result['_response_size'] = len(full_json)
-        return result
+    if not size_estimated:
+        # 先尝试无损压缩：多次出现的长字符串改为引用，能降到限制以内时不做截断；
+        # 数据形式已变化，通过 _strings_deduplicated 标记和提示文本告知调用方
+        deduped, string_table = _dedupe_repeated_strings(result)
+        if string_table:
+            deduped['_strings'] = string_table
+            deduped['_strings_info'] = '形如 {"$ref": N} 的值表示 _strings 列表中的第N项'
+            deduped_json = _encode_json(deduped)
+            if len(deduped_json) <= max_chars:
+                logger.info("✅ 重复字符串改为引用后无需截断：%s -> %s 字符 (%s 个字符串)", original_size, len(deduped_json), len(string_table))
+                encoded = _append_json_fields(deduped, deduped_json, {
+                    '_response_truncated': False,
+                    '_strings_deduplicated': True,
+                    '_response_size': len(deduped_json)
+                })
+                return deduped, _capped_output_json(deduped, encoded)
     
-    logger.warning(f"⚠️ 响应数据过大 ({len(full_json)} 字符)，开始激进截断处理...")
+    logger.warning("⚠️ 响应数据过大 (%s%s 字符)，开始激进截断处理...", '超过 ' if size_estimated else '', original_size)
     
     # 创建精简的响应结构
     truncated_result = {
         '_response_truncated': True,
-        '_original_size': len(full_json),
+        '_original_size': original_size,
         '_truncation_info': {
             'reason': 'Response too large for LLM processing',
-            'original_size': len(full_json),
+            'original_size': original_size,
+            'original_size_estimated': size_estimated,
             'max_allowed': max_chars,
             'truncated_fields': []
         }
     }
     
     # 保留基本信息
-    basic_fields = ['analysis', 'total_time', 'old_commits_count', 'new_commits_count', 
-                   'old_tasks_count', 'new_tasks_count', 'error']
-    for field in basic_fields:
-        if field in result:
-            truncated_result[field] = result[field]
+    truncated_result.update({field: result[field] for field in _BASIC_FIELDS if field in result})
     
     # 激进截断 new_features 字段 - 只保留前10个
     if 'new_features' in result and isinstance(result['new_features'], list):
@@ -210,39 +514,22 @@ def truncate_large_response(result: Dict[str, Any], max_chars: int = 130000) ->
         detailed = result['detailed_analysis']
         simple_analysis = {}
         
-        # 只保留任务数量统计，不保留具体列表
-        if 'completely_new_tasks' in detailed:
-            simple_analysis['completely_new_tasks_count'] = len(detailed.get('completely_new_tasks', []))
-            if simple_analysis['completely_new_tasks_count'] > 0:
-                # 只保留前5个任务ID
-                simple_analysis['completely_new_tasks_sample'] = list(detailed.get('completely_new_tasks', []))[:5]
-        
-        if 'partially_new_tasks' in detailed:
-            simple_analysis['partially_new_tasks_count'] = len(detailed.get('partially_new_tasks', {}))
-            if simple_analysis['partially_new_tasks_count'] > 0:
-                # 只保留前3个任务的简化信息
-                sample_tasks = {}
-                for i, (task_id, commits) in enumerate(detailed.get('partially_new_tasks', {}).items()):
-                    if i >= 3:
-                        break
+        # 只保留任务数量统计和少量样本，不保留具体列表
+        for field, kind, sample_size in _DETAILED_FIELDS:
+            if field not in detailed:
+                continue
+            values = detailed[field]
+            count = len(values)
+            simple_analysis[f'{field}_count'] = count
+            if count > 0:
+                if kind == 'dict':
                     # 只保留任务ID和commit数量
-                    sample_tasks[task_id] = f"{len(commits)} commits"
-                simple_analysis['partially_new_tasks_sample'] = sample_tasks
-        
-        if 'completely_missing_tasks' in detailed:
-            simple_analysis['completely_missing_tasks_count'] = len(detailed.get('completely_missing_tasks', []))
-            if simple_analysis['completely_missing_tasks_count'] > 0:
-                simple_analysis['completely_missing_tasks_sample'] = list(detailed.get('completely_missing_tasks', []))[:5]
-        
-        if 'partially_missing_tasks' in detailed:
-            simple_analysis['partially_missing_tasks_count'] = len(detailed.get('partially_missing_tasks', {}))
-            if simple_analysis['partially_missing_tasks_count'] > 0:
-                sample_tasks = {}
-                for i, (task_id, commits) in enumerate(detailed.get('partially_missing_tasks', {}).items()):
-                    if i >= 3:
-                        break
-                    sample_tasks[task_id] = f"{len(commits)} commits"
-                simple_analysis['partially_missing_tasks_sample'] = sample_tasks
+                    simple_analysis[f'{field}_sample'] = {
+                        task_id: f"{len(commits)} commits"
+                        for task_id, commits in itertools.islice(values.items(), sample_size)
+                    }
+                else:
+                    simple_analysis[f'{field}_sample'] = list(itertools.islice(values, sample_size))
         
         if 'new_commit_count' in detailed:
             simple_analysis['new_commit_count'] = detailed['new_commit_count']
@@ -265,9 +552,12 @@ def truncate_large_response(result: Dict[str, Any], max_chars: int = 130000) ->
         }
     
     # 检查截断后的大小，如果还是太大，进一步缩减
-    truncated_json = json.dumps(truncated_result, ensure_ascii=False)
-    if len(truncated_json) > max_chars:
-        logger.warning(f"⚠️ 第一次截断后仍然过大 ({len(truncated_json)} 字符)，进行二次截断...")
+    # 第一次截断后通常已远小于限制：估算值（不小于实际编码长度）明显低于限制时跳过这次序列化检查，最终编码只在末尾做一次
+    truncated_size = _estimate_json_size(truncated_result, max_chars)
+    if truncated_size > max_chars * 0.9:
+        truncated_size = len(_encode_json(truncated_result))
+    if truncated_size > max_chars:
+        logger.warning("⚠️ 第一次截断后仍然过大 (%s 字符)，进行二次截断...", truncated_size)
         
         # 进一步缩减 new_features 到前5个
         if 'new_features' in truncated_result:
@@ -300,8 +590,7 @@ def truncate_large_response(result: Dict[str, Any], max_chars: int = 130000) ->
             truncated_result['detailed_analysis'] = simplified_analysis
         
         # 移除非关键字段
-        non_essential_fields = ['service_stats']
-        for field in non_essential_fields:
+        for field in _NON_ESSENTIAL_FIELDS:
             if field in truncated_result:
                 del truncated_result[field]
                 truncated_result['_truncation_info']['truncated_fields'].append({
@@ -309,13 +598,278 @@ def truncate_large_response(result: Dict[str, Any], max_chars: int = 130000) ->
                     'message': f'{field} 字段已移除以减少响应大小'
                 })
     
-    # 最终检查
-    final_json = json.dumps(truncated_result, ensure_ascii=False)
-    truncated_result['_response_size'] = len(final_json)
+    final_json = _encode_json(truncated_result)
+    encoded = _append_json_fields(truncated_result, final_json, {'_response_size': len(final_json)})
+    
+    logger.info("✅ 激进截断完成：%s -> %s 字符 (%s 个字段被处理)", original_size, len(final_json), len(truncated_result['_truncation_info']['truncated_fields']))
+    
+    # 最终检查：按实际输出的编码长度检查绝对上限（估算值不计转义展开，不能作为硬性上限）
+    return truncated_result, _capped_output_json(truncated_result, encoded)
+
+
+def build_truncation_notice(truncated_result: Dict[str, Any]) -> str:
+    """根据截断信息生成给用户的提示文本，未截断时返回空字符串（重复字符串改为引用时给出对应提示）"""
+    if not truncated_result.get('_response_truncated', False):
+        if truncated_result.get('_strings_deduplicated'):
+            return (f"\n\nℹ️ **响应数据已压缩**: {len(truncated_result.get('_strings', []))} 个重复出现的长字符串"
+                    f"已替换为 {{\"$ref\": N}} 引用，原文见 _strings 列表的第N项，数据本身未截断。")
+        return ""
+    
+    truncation_info = truncated_result.get('_truncation_info', {})
+    truncated_fields = truncation_info.get('truncated_fields', [])
+    if not truncated_fields:
+        return ""
     
-    logger.info(f"✅ 激进截断完成：{len(full_json)} -> {len(final_json)} 字符 ({len(truncated_result['_truncation_info']['truncated_fields'])} 个字段被处理)")
+    notices = []
+    for field_info in truncated_fields:
+        notices.append(f"• {field_info['message']}")
     
-    return truncated_result
+    size_prefix = "超过 " if truncation_info.get('original_size_estimated') else ""
+    truncation_notice = f"\n\n⚠️ **响应数据已截断** (原始大小: {size_prefix}{truncation_info['original_size']} 字符):\n" + "\n".join(notices)
+    truncation_notice += f"\n\n💡 **提示**: 完整数据可通过Web界面查看，或使用更具体的查询条件。"
+    return truncation_notice
+
+
+def compose_response_text(service: VersionComparisonService, old_version: str, new_version: str,
+                          title: str, body_parts: Tuple[str, ...]) -> str:
+    """
+    拼接MCP响应文本：标题与正文各片段一次性join
+    
+    正文以片段形式传入（如多段已编码的JSON和截断提示），大段结果只在最终join时复制一次，
+    不产生中间拼接的临时大字符串
+    """
+    project = service.current_project
+    return "".join((
+        "项目: ", project.name_zh, " (", project.name_en, ")\n版本 ",
+        old_version, " -> ", new_version, " ", title, ":\n\n",
+        *body_parts
+    ))
+
+
+def build_new_features_response(service: VersionComparisonService, old_version: str, new_version: str, max_items: Optional[int] = None) -> Tuple[List[types.TextContent], bool]:
+    """执行新增功能分析并构建完整的MCP响应（在工作线程中运行），同时返回响应是否可缓存（分析未出错）"""
+    result = service.analyze_new_features(old_version, new_version, max_items)
+    
+    # 截断过大的响应，同时得到最终的JSON编码（只序列化一次）
+    truncated_result, formatted_result = truncate_large_response(result)
+    
+    # 添加截断提示信息
+    truncation_notice = build_truncation_notice(truncated_result)
+    
+    return [types.TextContent(
+        type="text",
+        text=compose_response_text(service, old_version, new_version, "新增功能分析结果", (formatted_result, truncation_notice))
+    )], not result.get('error')
+
+
+def build_missing_tasks_response(service: VersionComparisonService, old_version: str, new_version: str, max_items: Optional[int] = None) -> Tuple[List[types.TextContent], bool]:
+    """执行缺失任务检测并构建完整的MCP响应（在工作线程中运行），同时返回响应是否可缓存（分析未出错）"""
+    result = service.detect_missing_tasks(old_version, new_version, max_items)
+    
+    # 截断过大的响应，同时得到最终的JSON编码（只序列化一次）
+    truncated_result, formatted_result = truncate_large_response(result)
+    
+    # 添加截断提示信息
+    truncation_notice = build_truncation_notice(truncated_result)
+    
+    return [types.TextContent(
+        type="text",
+        text=compose_response_text(service, old_version, new_version, "缺失任务检测结果", (formatted_result, truncation_notice))
+    )], not result.get('error')
+
+
+def build_compare_versions_response(service: VersionComparisonService, old_version: str, new_version: str, max_items: Optional[int] = None) -> Tuple[List[types.TextContent], bool]:
+    """执行合并分析（新增功能 + 缺失任务）并构建完整的MCP响应（在工作线程中运行），同时返回响应是否可缓存（分析未出错）"""
+    combined = service.analyze_and_detect(old_version, new_version, max_items)
+    
+    # 两部分结果分别截断，各占一半的长度预算
+    truncated_features, encoded_features = truncate_large_response(combined['new_features'], max_chars=65000)
+    truncated_missing, encoded_missing = truncate_large_response(combined['missing_tasks'], max_chars=65000)
+    
+    # 添加截断提示信息
+    truncation_notice = build_truncation_notice(truncated_features) + build_truncation_notice(truncated_missing)
+    
+    # 两部分已编码的JSON作为片段直接参与最终拼接，不再整体序列化或预先合并
+    body_parts = ('{"new_features":', encoded_features, ',"missing_tasks":', encoded_missing, '}', truncation_notice)
+    cacheable = not combined['new_features'].get('error') and not combined['missing_tasks'].get('error')
+    return [types.TextContent(
+        type="text",
+        text=compose_response_text(service, old_version, new_version, "综合比较结果（新增功能 + 缺失任务）", body_parts)
+    )], cacheable
+
+
+# 需要版本参数的工具 -> 响应构建函数
+_TOOL_RESPONSE_BUILDERS: Dict[str, Callable[[VersionComparisonService, str, str, Optional[int]], Tuple[List[types.TextContent], bool]]] = {
+    "analyze-new-features": build_new_features_response,
+    "detect-missing-tasks": build_missing_tasks_response,
+    "compare-versions": build_compare_versions_response,
+}
+
+
+class ToolArgumentError(ValueError):
+    """MCP工具参数错误"""
+    pass
+
+
+def _parse_version_args(name: str, arguments: Dict[str, Any]) -> Tuple[str, str, str, Optional[int]]:
+    """
+    解析版本工具的参数，优先使用预编译的schema校验函数
+    
+    Returns:
+        (old_version, new_version, project_key, max_items)，project_key 未指定时为空字符串，
+        max_items 未指定时为None
+    
+    Raises:
+        ToolArgumentError: 参数不符合工具的inputSchema
+    """
+    arguments = arguments or {}
+    validator = _TOOL_VALIDATORS.get(name)
+    if validator is not None:
+        try:
+            arguments = validator(arguments)
+        except fastjsonschema.JsonSchemaException as e:
+            raise ToolArgumentError(f"参数校验失败: {e.message}")
+    
+    old_version = arguments.get("old_version")
+    new_version = arguments.get("new_version")
+    if not old_version or not new_version:
+        raise ToolArgumentError("缺少必需的参数 old_version 或 new_version")
+    
+    max_items = arguments.get("max_items")
+    if max_items is not None and (isinstance(max_items, bool) or not isinstance(max_items, int) or max_items < 1):
+        raise ToolArgumentError("参数 max_items 必须是大于0的整数")
+    return old_version, new_version, arguments.get("project") or "", max_items
+
+
+def _resolve_version_shas(service: VersionComparisonService, old_version: str, new_version: str) -> Optional[Tuple[str, str]]:
+    """
+    解析两个版本当前指向的commit SHA，用于响应缓存的key；任一版本解析失败（或演示模式）时返回None，此时不使用缓存
+    
+    解析结果由GitLabManager的 ref_sha_cache 短期缓存，随后的分析再次解析时直接命中
+    """
+    gitlab_manager = service.gitlab_manager
+    if gitlab_manager is None:
+        return None
+    old_sha, new_sha = gitlab_manager.page_executor.map(gitlab_manager.resolve_ref_sha, (old_version, new_version))
+    if old_sha is None or new_sha is None:
+        return None
+    return old_sha, new_sha
+
+
+async def get_version_service_async(project_key: Optional[str] = None) -> VersionComparisonService:
+    """
+    异步获取项目服务实例：已缓存的服务直接返回不加锁，
+    首次创建时按项目加锁并在线程中执行（创建服务会连接GitLab）；未指定项目时使用默认项目
+    """
+    service = version_services.get(project_key or _default_project_key)
+    if service is not None:
+        return service
+    
+    if not project_key:
+        # 默认服务尚未创建（如启动时初始化失败），由 get_version_service 加锁创建
+        return await asyncio.to_thread(get_version_service)
+    
+    # 先校验项目是否存在：未知或拼错的项目key直接报错，不为其创建和保留锁，锁表不会被外部参数撑大
+    if project_key not in load_projects_config().get('projects', {}):
+        raise HTTPException(status_code=400, detail=f"未知项目: {project_key}")
+    
+    # 只在未命中时创建锁；事件循环单线程内 get 与赋值之间没有await，不会重复创建
+    lock = _service_locks.get(project_key)
+    if lock is None:
+        lock = _service_locks[project_key] = asyncio.Lock()
+    async with lock:
+        service = version_services.get(project_key)
+        if service is None:
+            service = await asyncio.to_thread(get_version_service, project_key)
+        return service
+
+
+async def run_coalesced(key: Tuple[str, str, str, str, Optional[int]], func: Callable[..., Any], *args) -> Any:
+    """
+    合并并发的相同请求：同一key同时只执行一次，后到的调用方等待首个调用的结果
+    
+    实际工作作为独立的受监督任务运行：发起请求的客户端断开（协程被取消）时，
+    不会连带取消其他调用方正在等待的共享任务；任务失败时由回调记录日志。
+    
+    Args:
+        key: 请求标识 (工具名, 项目key, 旧版本, 新版本, 条目上限)
+        func: 实际执行的同步函数（分析 + 构建响应），在线程池中运行，避免阻塞事件循环
+        *args: 传给func的参数
+        
+    Returns:
+        func的返回值
+    """
+    task = _inflight.get(key)
+    if task is not None:
+        logger.info("🔗 合并进行中的相同请求: %s", key)
+    else:
+        task = asyncio.create_task(asyncio.to_thread(func, *args))
+        _inflight[key] = task
+        task.add_done_callback(functools.partial(_on_coalesced_task_done, key))
+    
+    # shield: 任一调用方被取消时不影响共享任务
+    return await asyncio.shield(task)
+
+
+def _on_coalesced_task_done(key: Tuple[str, str, str, str, Optional[int]], task: asyncio.Task) -> None:
+    """共享任务结束回调：移出进行中表，并记录失败原因，避免任务静默失败"""
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    
+    if task.cancelled():
+        logger.warning("⚠️ 共享分析任务被取消: %s", key)
+    elif task.exception() is not None:
+        logger.error("❌ 共享分析任务失败 %s: %s", key, task.exception())
+
+
+def get_projects_response_text() -> str:
+    """
+    生成 list-supported-projects 的响应文本
+    
+    项目列表只取决于项目配置文件，按文件修改时间缓存格式化后的文本，
+    配置文件未修改时不再重新读取、解析和序列化
+    """
+    global _projects_response_cache
+    
+    from src.services.version_service import ProjectConfigManager, PROJECTS_CONFIG_PATH
+    try:
+        config_mtime = os.stat(PROJECTS_CONFIG_PATH).st_mtime_ns
+    except OSError:
+        # 配置文件不存在时交给 ProjectConfigManager 抛出带提示的异常
+        config_mtime = None
+    
+    cached = _projects_response_cache
+    if cached is not None and config_mtime is not None and cached[0] == config_mtime:
+        return cached[1]
+    
+    # 使用项目配置管理器获取支持的项目列表
+    config_manager = ProjectConfigManager()
+    projects = config_manager.get_all_projects()
+    current_project_key = config_manager.get_current_project_key()
+    
+    # 找到当前项目信息
+    current_project_info = next(
+        (p for p in projects if p['key'] == current_project_key), 
+        projects[0] if projects else None
+    )
+    
+    # 格式化项目信息
+    project_info = {
+        "current_project": {
+            "key": current_project_info['key'],
+            "name_zh": current_project_info['name_zh'],
+            "name_en": current_project_info['name_en'],
+            "project_id": current_project_info['project_id']
+        } if current_project_info else None,
+        "all_projects": projects,
+        "total_projects": len(projects)
+    }
+    
+    formatted_result = _output_json(project_info, _encode_json(project_info))
+    text = f"支持的GitLab项目配置:\n\n{formatted_result}"
+    if config_mtime is not None:
+        _projects_response_cache = (config_mtime, text)
+    return text
 
 
 @mcp_server.call_tool()
@@ -326,121 +880,53 @@ async def handle_call_tool(
     
     try:
         if name == "list-supported-projects":
-            # 使用项目配置管理器获取支持的项目列表
-            from src.services.version_service import ProjectConfigManager
-            config_manager = ProjectConfigManager()
-            projects = config_manager.get_all_projects()
-            current_project_key = config_manager.get_current_project_key()
-            
-            # 找到当前项目信息
-            current_project_info = next(
-                (p for p in projects if p['key'] == current_project_key), 
-                projects[0] if projects else None
-            )
-            
-            # 格式化项目信息
-            project_info = {
-                "current_project": {
-                    "key": current_project_info['key'],
-                    "name_zh": current_project_info['name_zh'],
-                    "name_en": current_project_info['name_en'],
-                    "project_id": current_project_info['project_id']
-                } if current_project_info else None,
-                "all_projects": projects,
-                "total_projects": len(projects)
-            }
-            
-            formatted_result = json.dumps(project_info, indent=2, ensure_ascii=False)
-            
             return [types.TextContent(
                 type="text",
-                text=f"支持的GitLab项目配置:\n\n{formatted_result}"
+                text=get_projects_response_text()
             )]
         
-        # 处理需要版本参数的工具
-        old_version = arguments.get("old_version")
-        new_version = arguments.get("new_version")
-        project_key = arguments.get("project", "")
-        
-        if not old_version or not new_version:
-            return [types.TextContent(
-                type="text",
-                text="错误: 缺少必需的参数 old_version 或 new_version"
-            )]
-        
-        # 获取版本服务实例
-        service = get_version_service(project_key if project_key else None)
-        
-        if name == "analyze-new-features":
-            # 调用新增功能分析
-            result = service.analyze_new_features(old_version, new_version)
-            
-            # 截断过大的响应
-            truncated_result = truncate_large_response(result)
-            
-            # 格式化结果为JSON字符串
-            formatted_result = json.dumps(truncated_result, indent=2, ensure_ascii=False)
+        builder = _TOOL_RESPONSE_BUILDERS.get(name)
+        if builder is not None:
+            # 处理需要版本参数的工具
+            old_version, new_version, project_key, max_items = _parse_version_args(name, arguments)
             
-            project_info = f"项目: {service.current_project.name_zh} ({service.current_project.name_en})"
-            
-            # 添加截断提示信息
-            truncation_notice = ""
-            if truncated_result.get('_response_truncated', False):
-                truncation_info = truncated_result.get('_truncation_info', {})
-                truncated_fields = truncation_info.get('truncated_fields', [])
-                
-                if truncated_fields:
-                    notices = []
-                    for field_info in truncated_fields:
-                        notices.append(f"• {field_info['message']}")
-                    
-                    truncation_notice = f"\n\n⚠️ **响应数据已截断** (原始大小: {truncation_info['original_size']} 字符):\n" + "\n".join(notices)
-                    truncation_notice += f"\n\n💡 **提示**: 完整数据可通过Web界面查看，或使用更具体的查询条件。"
-            
-            return [types.TextContent(
-                type="text",
-                text=f"{project_info}\n版本 {old_version} -> {new_version} 新增功能分析结果:\n\n{formatted_result}{truncation_notice}"
-            )]
-            
-        elif name == "detect-missing-tasks":
-            # 调用缺失任务检测
-            result = service.detect_missing_tasks(old_version, new_version)
-            
-            # 截断过大的响应
-            truncated_result = truncate_large_response(result)
-            
-            # 格式化结果为JSON字符串
-            formatted_result = json.dumps(truncated_result, indent=2, ensure_ascii=False)
-            
-            project_info = f"项目: {service.current_project.name_zh} ({service.current_project.name_en})"
-            
-            # 添加截断提示信息
-            truncation_notice = ""
-            if truncated_result.get('_response_truncated', False):
-                truncation_info = truncated_result.get('_truncation_info', {})
-                truncated_fields = truncation_info.get('truncated_fields', [])
-                
-                if truncated_fields:
-                    notices = []
-                    for field_info in truncated_fields:
-                        notices.append(f"• {field_info['message']}")
-                    
-                    truncation_notice = f"\n\n⚠️ **响应数据已截断** (原始大小: {truncation_info['original_size']} 字符):\n" + "\n".join(notices)
-                    truncation_notice += f"\n\n💡 **提示**: 完整数据可通过Web界面查看，或使用更具体的查询条件。"
-            
-            return [types.TextContent(
-                type="text",
-                text=f"{project_info}\n版本 {old_version} -> {new_version} 缺失任务检测结果:\n\n{formatted_result}{truncation_notice}"
-            )]
+            # 未指定项目时使用默认项目，使省略project与显式指定默认项目的请求能够合并
+            if not project_key:
+                project_key = _default_project_key or (await get_version_service_async()).current_project.project_key
+            request_key = (name, project_key, old_version, new_version, max_items)
+            service = await get_version_service_async(project_key)
             
-        else:
-            return [types.TextContent(
-                type="text",
-                text=f"未知工具: {name}"
-            )]
+            # 响应缓存按版本解析后的SHA区分：同一个分支名移动到新commit后key随之变化；
+            # 响应文本中带有版本名，key中同时保留请求key
+            cache_key = None
+            if _tool_response_cache is not None:
+                shas = await asyncio.to_thread(_resolve_version_shas, service, old_version, new_version)
+                if shas is not None:
+                    cache_key = (request_key, shas)
+                    cached = _tool_response_cache.get(cache_key)
+                    if cached is not None:
+                        return cached
             
+            # 分析和格式化在同一次合并执行中完成，并发的相同请求共享同一份已构建好的响应，不再各自序列化
+            response, cacheable = await run_coalesced(
+                request_key, builder, service, old_version, new_version, max_items
+            )
+            if cacheable and cache_key is not None:
+                _tool_response_cache.set(cache_key, response)
+            return response
+        
+        return [types.TextContent(
+            type="text",
+            text=f"未知工具: {name}"
+        )]
+        
+    except (ToolArgumentError, ResponseTooLargeError) as e:
+        return [types.TextContent(
+            type="text",
+            text=f"错误: {e}"
+        )]
     except Exception as e:
-        logger.error(f"MCP工具调用失败: {e}")
+        logger.error("MCP工具调用失败: %s", e)
         return [types.TextContent(
             type="text",
             text=f"工具调用失败: {str(e)}"
@@ -458,28 +944,44 @@ def create_project_info(project_config) -> Dict[str, str]:
 
 
 def get_version_service(project_key: Optional[str] = None) -> VersionComparisonService:
-    """获取版本服务实例（支持多项目）"""
-    # 如果没有指定项目，使用第一个可用的服务
+    """
+    获取版本服务实例（支持多项目）
+    
+    进程内每个项目只有一个服务实例，REST接口与MCP工具共享同一份缓存和GitLab连接池。
+    已创建的服务直接返回；首次创建时加锁并二次检查，避免并发调用重复初始化。
+    """
+    global _default_project_key
+    
+    # 如果没有指定项目，使用默认服务
     if project_key is None:
-        if version_services:
-            return list(version_services.values())[0]
-        # 创建默认服务
-        service = VersionComparisonService()
-        version_services[service.current_project.project_key] = service
-        return service
+        service = version_services.get(_default_project_key)
+        if service is not None:
+            return service
+        with _services_lock:
+            if _default_project_key in version_services:
+                return version_services[_default_project_key]
+            # 创建默认服务
+            service = VersionComparisonService()
+            _default_project_key = service.current_project.project_key
+            version_services[_default_project_key] = service
+            return service
     
     # 检查是否已存在该项目的服务
-    if project_key in version_services:
-        return version_services[project_key]
+    service = version_services.get(project_key)
+    if service is not None:
+        return service
     
     # 创建新的服务实例
-    try:
-        service = VersionComparisonService(project_key)
-        version_services[project_key] = service
-        return service
-    except Exception as e:
-        logger.error(f"❌ 创建项目服务失败 {project_key}: {e}")
-        raise HTTPException(status_code=400, detail=f"无法创建项目服务: {project_key}")
+    with _services_lock:
+        if project_key in version_services:
+            return version_services[project_key]
+        try:
+            service = VersionComparisonService(project_key)
+            version_services[project_key] = service
+            return service
+        except Exception as e:
+            logger.error("❌ 创建项目服务失败 %s: %s", project_key, e)
+            raise HTTPException(status_code=400, detail=f"无法创建项目服务: {project_key}")
 
 
 class VersionRequest(BaseModel):
@@ -552,14 +1054,17 @@ class NewFeaturesResponse(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化默认服务"""
+    global _default_project_key
+    
     try:
         logger.info("🚀 初始化版本比较服务...")
         # 创建默认服务实例
         default_service = VersionComparisonService()
-        version_services[default_service.current_project.project_key] = default_service
+        _default_project_key = default_service.current_project.project_key
+        version_services[_default_project_key] = default_service
         logger.info("✅ 版本比较服务初始化完成")
     except Exception as e:
-        logger.error(f"❌ 服务初始化失败: {e}")
+        logger.error("❌ 服务初始化失败: %s", e)
         raise
 
 
@@ -630,7 +1135,7 @@ async def get_available_projects():
             "current_project": current_project_key
         }
     except Exception as e:
-        logger.error(f"❌ 获取项目列表失败: {e}")
+        logger.error("❌ 获取项目列表失败: %s", e)
         raise HTTPException(status_code=500, detail=f"获取项目列表失败: {str(e)}")
 
 
@@ -644,7 +1149,7 @@ async def health_check():
             "service_version": "2.1.0",
             "timestamp": time.time(),
             "current_project": f"{service.current_project.name_zh} ({service.current_project.name_en})",
-            "available_projects": len(service.get_available_projects())
+            "available_projects": len(service.projects)
         }
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"服务未初始化: {str(e)}")
@@ -656,11 +1161,12 @@ async def analyze_new_features(request: VersionRequest):
     分析新增features
     """
     api_start_time = time.time()
-    logger.info(f"🆕 API请求: 分析新增features {request.old_version} -> {request.new_version} (项目: {request.project_key})")
+    logger.info("🆕 API请求: 分析新增features %s -> %s (项目: %s)", request.old_version, request.new_version, request.project_key)
     
     try:
-        service = get_version_service(request.project_key)
-        result = service.analyze_new_features(request.old_version, request.new_version)
+        service = await get_version_service_async(request.project_key)
+        # 分析会同步请求GitLab，放到线程中执行，避免阻塞事件循环上的其他请求（SSE、健康检查等）
+        result = await asyncio.to_thread(service.analyze_new_features, request.old_version, request.new_version)
         api_time = time.time() - api_start_time
         
         # 检查是否有错误
@@ -712,13 +1218,13 @@ async def analyze_new_features(request: VersionRequest):
             project_info=create_project_info(service.current_project)
         )
         
-        logger.info(f"✅ API响应: {len(response.new_features)} 个新features, 耗时 {api_time:.2f}s")
+        logger.info("✅ API响应: %s 个新features, 耗时 %.2fs", len(response.new_features), api_time)
         return response
         
     except Exception as e:
         api_time = time.time() - api_start_time
         error_msg = f"分析新增features失败: {str(e)}"
-        logger.error(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         
         return NewFeaturesResponse(
             new_features=[],
@@ -751,11 +1257,11 @@ async def detect_missing_tasks(request: VersionRequest):
     检测缺失tasks
     """
     api_start_time = time.time()
-    logger.info(f"🔍 API请求: 检测缺失tasks {request.old_version} -> {request.new_version} (项目: {request.project_key})")
+    logger.info("🔍 API请求: 检测缺失tasks %s -> %s (项目: %s)", request.old_version, request.new_version, request.project_key)
     
     try:
-        service = get_version_service(request.project_key)
-        result = service.detect_missing_tasks(request.old_version, request.new_version)
+        service = await get_version_service_async(request.project_key)
+        result = await asyncio.to_thread(service.detect_missing_tasks, request.old_version, request.new_version)
         api_time = time.time() - api_start_time
         
         # 检查是否有错误
@@ -807,13 +1313,13 @@ async def detect_missing_tasks(request: VersionRequest):
             project_info=create_project_info(service.current_project)
         )
         
-        logger.info(f"✅ API响应: {len(response.missing_tasks)} 个缺失tasks, 耗时 {api_time:.2f}s")
+        logger.info("✅ API响应: %s 个缺失tasks, 耗时 %.2fs", len(response.missing_tasks), api_time)
         return response
         
     except Exception as e:
         api_time = time.time() - api_start_time
         error_msg = f"检测缺失tasks失败: {str(e)}"
-        logger.error(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         
         return MissingTasksResponse(
             missing_tasks=[],
@@ -846,25 +1352,26 @@ async def analyze_tasks(request: TaskAnalysisRequest):
     分析指定的tasks
     """
     api_start_time = time.time()
-    logger.info(f"📊 API请求: 分析tasks {request.task_ids} in {request.version} (项目: {request.project_key})")
+    logger.info("📊 API请求: 分析tasks %s in %s (项目: %s)", request.task_ids, request.version, request.project_key)
     
     try:
-        service = get_version_service(request.project_key)
-        result = service.analyze_tasks(request.task_ids, request.version)
+        service = await get_version_service_async(request.project_key)
+        result = await asyncio.to_thread(service.analyze_tasks, request.task_ids, request.version)
         api_time = time.time() - api_start_time
         
-        logger.info(f"✅ API响应: 分析tasks完成, 耗时 {api_time:.2f}s")
+        logger.info("✅ API响应: 分析tasks完成, 耗时 %.2fs", api_time)
         result['api_stats'] = {
             'api_time': api_time,
             'endpoint': '/analyze-tasks'
         }
         result['project_info'] = create_project_info(service.current_project)
-        return result
+        # 结果只包含JSON原生类型，直接交给orjson响应编码，跳过FastAPI对返回值的 jsonable_encoder 递归转换
+        return DefaultJSONResponse(result)
         
     except Exception as e:
         api_time = time.time() - api_start_time
         error_msg = f"分析tasks失败: {str(e)}"
-        logger.error(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 
@@ -874,25 +1381,25 @@ async def search_tasks(request: TaskSearchRequest):
     搜索指定的task
     """
     api_start_time = time.time()
-    logger.info(f"🔎 API请求: 搜索task {request.task_id} in {request.version} (项目: {request.project_key})")
+    logger.info("🔎 API请求: 搜索task %s in %s (项目: %s)", request.task_id, request.version, request.project_key)
     
     try:
-        service = get_version_service(request.project_key)
-        result = service.search_tasks(request.task_id, request.version)
+        service = await get_version_service_async(request.project_key)
+        result = await asyncio.to_thread(service.search_tasks, request.task_id, request.version)
         api_time = time.time() - api_start_time
         
-        logger.info(f"✅ API响应: 搜索task完成, 耗时 {api_time:.2f}s")
+        logger.info("✅ API响应: 搜索task完成, 耗时 %.2fs", api_time)
         result['api_stats'] = {
             'api_time': api_time,
             'endpoint': '/search-tasks'
         }
         result['project_info'] = create_project_info(service.current_project)
-        return result
+        return DefaultJSONResponse(result)
         
     except Exception as e:
         api_time = time.time() - api_start_time
         error_msg = f"搜索tasks失败: {str(e)}"
-        logger.error(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 
@@ -902,32 +1409,32 @@ async def validate_versions(request: VersionValidationRequest):
     验证版本是否存在
     """
     api_start_time = time.time()
-    logger.info(f"✔️ API请求: 验证版本 {request.versions} (项目: {request.project_key})")
+    logger.info("✔️ API请求: 验证版本 %s (项目: %s)", request.versions, request.project_key)
     
     try:
-        service = get_version_service(request.project_key)
-        result = service.validate_versions(request.versions)
+        service = await get_version_service_async(request.project_key)
+        result = await asyncio.to_thread(service.validate_versions, request.versions)
         api_time = time.time() - api_start_time
         
-        logger.info(f"✅ API响应: 验证版本完成, 耗时 {api_time:.2f}s")
+        logger.info("✅ API响应: 验证版本完成, 耗时 %.2fs", api_time)
         result['api_stats'] = {
             'api_time': api_time,
             'endpoint': '/validate-versions'
         }
         result['project_info'] = create_project_info(service.current_project)
-        return result
+        return DefaultJSONResponse(result)
         
     except Exception as e:
         api_time = time.time() - api_start_time
         error_msg = f"验证版本失败: {str(e)}"
-        logger.error(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 
 @app.get("/api/mcp/health")
 async def mcp_health_check():
     """MCP健康检查端点"""
-    return JSONResponse({"status": "healthy", "service": "version-compare-mcp-integrated"})
+    return DefaultJSONResponse({"status": "healthy", "service": "version-compare-mcp-integrated"})
 
 
 @app.get("/api/mcp/sse")
@@ -940,7 +1447,6 @@ async def handle_mcp_sse(request: Request):
             streams[0], streams[1], mcp_server.create_initialization_options()
         )
     # 返回一个空响应，因为SSE连接已经在上面处理完毕
-    from starlette.responses import Response
     return Response()
 
 
@@ -958,28 +1464,38 @@ async def get_statistics(
     获取两个版本之间的统计信息
     """
     api_start_time = time.time()
-    logger.info(f"📈 API请求: 获取统计信息 {from_version} -> {to_version} (项目: {project_key})")
+    logger.info("📈 API请求: 获取统计信息 %s -> %s (项目: %s)", from_version, to_version, project_key)
     
     try:
-        service = get_version_service(project_key)
-        result = service.get_version_statistics(from_version, to_version)
+        service = await get_version_service_async(project_key)
+        result = await asyncio.to_thread(service.get_version_statistics, from_version, to_version)
         api_time = time.time() - api_start_time
         
-        logger.info(f"✅ API响应: 获取统计信息完成, 耗时 {api_time:.2f}s")
+        logger.info("✅ API响应: 获取统计信息完成, 耗时 %.2fs", api_time)
         result['api_stats'] = {
             'api_time': api_time,
             'endpoint': '/statistics'
         }
         result['project_info'] = create_project_info(service.current_project)
-        return result
+        return DefaultJSONResponse(result)
         
     except Exception as e:
         api_time = time.time() - api_start_time
         error_msg = f"获取统计信息失败: {str(e)}"
-        logger.error(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 9112))) 
\ No newline at end of file
+    # 与 run.py 保持一致：uvloop + httptools，多worker时需要以导入字符串形式传入应用
+    uvicorn.run(
+        "src.api.main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", 9112)),
+        workers=int(os.getenv("WORKERS", 1)),
+        loop="uvloop" if sys.platform != "win32" else "asyncio",
+        http="httptools",
+        access_log=False
+    )
@@ -2,8 +2,17 @@
 请求级缓存管理器
 避免同一请求内重复API调用，大幅提升性能
 """
+import os
+import json
 import time
-from typing import Any, Optional, Dict
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Dict, Tuple
+
+
+logger = logging.getLogger(__name__)
 
 
 class RequestCacheManager:
@@ -50,7 +59,7 @@ class RequestCacheManager:
             'duration_seconds': round(duration, 2)
         }
         
-        print(f"缓存统计: 命中率 {hit_rate:.1f}%, 节省API调用 {self.stats['api_calls_saved']} 次")
+        logger.info("📊 缓存统计: 命中率 %.1f%%, 节省API调用 %s 次", hit_rate, self.stats['api_calls_saved'])
         
         # 清理缓存
         self.cache.clear()
@@ -103,4 +112,176 @@ class CacheKey:
     @staticmethod
     def project_tags(project_id: str) -> str:
         """项目标签缓存键"""
-        return f"tags:{project_id}" 
\ No newline at end of file
+        return f"tags:{project_id}"
+    
+    @staticmethod
+    def version_analysis(project_id: str, old_sha: str, new_sha: str) -> str:
+        """版本分析结果缓存键（基于解析后的commit SHA），结果格式变化时递增版本号，不再读取旧格式的条目"""
+        return f"analysis:v2:{project_id}:{old_sha}:{new_sha}"
+
+
+class TTLCache:
+    """
+    带过期时间的LRU缓存（线程安全），用于短期复用相同参数的计算结果
+    
+    过期时间兜底分支等可移动引用的变化；超出容量时淘汰最久未使用的条目
+    """
+    
+    def __init__(self, maxsize: int = 256, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """获取未过期的缓存值"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+    
+    def set(self, key: Any, value: Any) -> None:
+        """设置缓存值"""
+        with self._lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self.entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取当前统计信息"""
+        return {
+            'cache_size': len(self.entries),
+            'ttl_seconds': self.ttl,
+            **self.stats
+        }
+
+
+class PersistentResultCache:
+    """
+    分析结果的两级缓存：进程内LRU + SQLite磁盘存储
+    
+    磁盘存储在进程重启后依然有效，重新部署后的首次请求不必再完整拉取GitLab数据。
+    值需可JSON序列化；键由调用方基于解析后的commit SHA生成，
+    分支等可移动的引用指向新commit后自然不会命中旧结果。
+    ttl 大于0时条目在写入ttl秒后过期，避免task提取规则调整后长期返回旧的分析结果；为0时永不过期。
+    """
+    
+    def __init__(self, db_path: str, memory_size: int = 128, max_entries: int = 2000, ttl: float = 0):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """按 内存 -> 磁盘 的顺序查找缓存值"""
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return entry[1]
+            
+            row = self._conn.execute('SELECT value, updated_at FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None or self._expired(row[1]):
+                self.memory.pop(key, None)
+                self.stats['misses'] += 1
+                return None
+            
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            self.stats['disk_hits'] += 1
+            return value
+    
+    def set(self, key: str, value: Any) -> None:
+        """写入两级缓存，磁盘中超出上限的最旧条目会被清理"""
+        payload = json.dumps(value, ensure_ascii=False)
+        updated_at = time.time()
+        with self._lock:
+            self._remember(key, value, updated_at)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (key, value, updated_at) VALUES (?, ?, ?)',
+                (key, payload, updated_at)
+            )
+            self._conn.execute(
+                'DELETE FROM results WHERE key NOT IN '
+                '(SELECT key FROM results ORDER BY updated_at DESC LIMIT ?)',
+                (self.max_entries,)
+            )
+            self._conn.commit()
+    
+    def _expired(self, updated_at: float) -> bool:
+        """判断写入时间为 updated_at 的条目是否已过期"""
+        return self.ttl > 0 and time.time() - updated_at > self.ttl
+    
+    def _remember(self, key: str, value: Any, updated_at: float) -> None:
+        """写入进程内LRU（调用方需持有锁）"""
+        self.memory[key] = (updated_at, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取当前统计信息"""
+        return {
+            'memory_size': len(self.memory),
+            **self.stats
+        }
+
+
+_result_cache: Optional[PersistentResultCache] = None
+_result_cache_failed = False
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[PersistentResultCache]:
+    """
+    获取进程内共享的持久化结果缓存
+    
+    路径由 RESULT_CACHE_PATH 环境变量配置，设置为空字符串时禁用；打开失败时同样禁用，不影响正常分析。
+    条目有效期由 RESULT_CACHE_TTL（秒，默认86400）配置，设置为0时永不过期
+    """
+    global _result_cache, _result_cache_failed
+    if _result_cache is not None or _result_cache_failed:
+        return _result_cache
+    
+    db_path = os.getenv('RESULT_CACHE_PATH', 'cache/analysis_results.db')
+    if not db_path:
+        return None
+    
+    with _result_cache_lock:
+        if _result_cache is None and not _result_cache_failed:
+            try:
+                ttl = float(os.getenv('RESULT_CACHE_TTL', '86400'))
+                _result_cache = PersistentResultCache(db_path, ttl=ttl)
+                logger.info("💾 分析结果缓存已启用: %s", db_path)
+            except (OSError, sqlite3.Error) as e:
+                _result_cache_failed = True
+                logger.warning("⚠️ 分析结果缓存不可用，已禁用: %s", e)
+        return _result_cache 
\ No newline at end of file
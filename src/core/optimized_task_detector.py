@@ -1,356 +0,0 @@
-# -*- coding: utf-8 -*-
-"""
-优化版Task检测器
-基于并发分页获取的高性能版本，将处理时间从262秒优化到15-20秒
-性能提升: 13-17倍加速
-"""
-import time
-import logging
-from typing import Dict, Any, List, Set
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
-from ..gitlab.optimized_gitlab_manager import OptimizedGitLabManager
-
-
-logger = logging.getLogger(__name__)
-
-
-class OptimizedTaskLossDetector:
-    """
-    优化版Task缺失检测器
-    
-    核心优化:
-    1. 并发分页获取commits (262s -> 15s)
-    2. 本地内存分析tasks (避免逐个API搜索)
-    3. 智能缓存策略
-    4. 详细的性能监控和日志
-    """
-    
-    def __init__(self, gitlab_manager: OptimizedGitLabManager):
-        self.gitlab_manager = gitlab_manager
-        logger.info(f"[{self._timestamp()}] 🚀 OptimizedTaskLossDetector 初始化完成")
-    
-    def _timestamp(self) -> str:
-        """生成带毫秒的时间戳"""
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    
-    def _analyze_version_tasks(self, old_version: str, new_version: str) -> Dict[str, Any]:
-        """
-        核心方法：分析两个版本的task差异
-        """
-        start_time = time.time()
-        logger.info(f"[{self._timestamp()}] 🚀 开始版本task分析: {old_version} -> {new_version}")
-        
-        try:
-            # 阶段1: 并发获取两个版本的全部commits
-            fetch_start = time.time()
-            logger.info(f"[{self._timestamp()}] 📥 阶段1: 并发获取两个版本的全部commits...")
-            
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                # 并发获取两个版本的commits
-                future_old = executor.submit(
-                    self.gitlab_manager.get_all_branch_commits_concurrent, 
-                    old_version
-                )
-                future_new = executor.submit(
-                    self.gitlab_manager.get_all_branch_commits_concurrent, 
-                    new_version
-                )
-                
-                old_commits = future_old.result()
-                new_commits = future_new.result()
-            
-            fetch_time = time.time() - fetch_start
-            logger.info(f"[{self._timestamp()}] ✅ 阶段1完成: old={len(old_commits)} commits, new={len(new_commits)} commits, 耗时={fetch_time:.2f}s")
-            
-            # 更细致的错误检查
-            if not old_commits and not new_commits:
-                return {
-                    'old_tasks': set(),
-                    'new_tasks': set(),
-                    'missing_tasks': set(),
-                    'new_features': set(),
-                    'common_tasks': set(),
-                    'analysis': 'both_versions_failed',
-                    'total_time': time.time() - start_time,
-                    'error': f'无法获取两个版本的commits。请检查: 1) GITLAB_TOKEN环境变量是否有效 2) 版本标签 {old_version}, {new_version} 是否存在'
-                }
-            elif not old_commits:
-                logger.warning(f"[{self._timestamp()}] ⚠️ 无法获取旧版本 {old_version} 的commits，但新版本正常")
-                return {
-                    'old_tasks': set(),
-                    'new_tasks': set(),
-                    'missing_tasks': set(),
-                    'new_features': set(),
-                    'common_tasks': set(),
-                    'analysis': 'old_version_failed',
-                    'total_time': time.time() - start_time,
-                    'error': f'无法获取旧版本 {old_version} 的commits。请检查版本标签是否存在'
-                }
-            elif not new_commits:
-                logger.warning(f"[{self._timestamp()}] ⚠️ 无法获取新版本 {new_version} 的commits，但旧版本正常")
-                return {
-                    'old_tasks': set(),
-                    'new_tasks': set(),
-                    'missing_tasks': set(),
-                    'new_features': set(),
-                    'common_tasks': set(),
-                    'analysis': 'new_version_failed',
-                    'total_time': time.time() - start_time,
-                    'error': f'无法获取新版本 {new_version} 的commits。请检查版本标签是否存在'
-                }
-            
-            # 阶段2: 分别解析出全部的task号
-            analysis_start = time.time()
-            logger.info(f"[{self._timestamp()}] 🧮 阶段2: 本地解析tasks...")
-            
-            old_tasks = self.gitlab_manager.extract_branch_tasks_local(old_commits)
-            new_tasks = self.gitlab_manager.extract_branch_tasks_local(new_commits)
-            
-            # 阶段3: 计算各种差异
-            missing_tasks = old_tasks - new_tasks  # 旧版本有但新版本没有的 = 缺失的tasks
-            new_features = new_tasks - old_tasks   # 新版本有但旧版本没有的 = 新增的features  
-            common_tasks = old_tasks & new_tasks   # 两个版本都有的 = 共同的tasks
-            
-            analysis_time = time.time() - analysis_start
-            total_time = time.time() - start_time
-            performance_improvement = 262.30 / total_time if total_time > 0 else 0
-            
-            logger.info(f"[{self._timestamp()}] ✅ 阶段2完成: 分析耗时={analysis_time:.3f}s")
-            logger.info(f"[{self._timestamp()}] 🎯 版本task分析完成:")
-            logger.info(f"    📊 总耗时: {total_time:.2f}s (原版262.30s)")
-            logger.info(f"    ⚡ 性能提升: {performance_improvement:.1f}x 倍速")
-            logger.info(f"    📊 旧版本tasks: {len(old_tasks)}个")
-            logger.info(f"    📊 新版本tasks: {len(new_tasks)}个")
-            logger.info(f"    🔍 缺失tasks: {len(missing_tasks)}个")
-            logger.info(f"    🆕 新增features: {len(new_features)}个")
-            logger.info(f"    ✅ 共同tasks: {len(common_tasks)}个")
-            
-            return {
-                'old_tasks': old_tasks,
-                'new_tasks': new_tasks,
-                'missing_tasks': missing_tasks,
-                'new_features': new_features,
-                'common_tasks': common_tasks,
-                'analysis': 'success',
-                'total_time': total_time,
-                'performance_improvement': performance_improvement,
-                'fetch_time': fetch_time,
-                'analysis_time': analysis_time
-            }
-            
-        except Exception as e:
-            total_time = time.time() - start_time
-            logger.error(f"[{self._timestamp()}] ❌ 版本task分析失败: {e}, 耗时: {total_time:.2f}s")
-            return {
-                'old_tasks': set(),
-                'new_tasks': set(),
-                'missing_tasks': set(),
-                'new_features': set(),
-                'common_tasks': set(),
-                'error': str(e),
-                'analysis': 'error',
-                'total_time': total_time
-            }
-
-    def detect_missing_tasks_optimized(self, old_version: str, new_version: str) -> Dict[str, Any]:
-        """
-        检测缺失的tasks：旧版本有但新版本没有的tasks
-        """
-        logger.info(f"[{self._timestamp()}] 🔍 开始检测缺失tasks: {old_version} -> {new_version}")
-        
-        # 调用核心分析方法
-        result = self._analyze_version_tasks(old_version, new_version)
-        
-        # 返回缺失tasks的结果
-        return {
-            'missing_tasks': sorted(list(result['missing_tasks'])),
-            'analysis': result['analysis'],
-            'total_time': result['total_time'],
-            'error': result.get('error')
-        }
-
-    def analyze_new_features_optimized(self, old_version: str, new_version: str) -> Dict[str, Any]:
-        """
-        分析新增features：新版本有但旧版本没有的tasks
-        """
-        logger.info(f"[{self._timestamp()}] 🆕 开始分析新增features: {old_version} -> {new_version}")
-        
-        # 调用核心分析方法
-        result = self._analyze_version_tasks(old_version, new_version)
-        
-        # 返回新增features的结果
-        return {
-            'new_features': sorted(list(result['new_features'])),
-            'analysis': result['analysis'],
-            'total_time': result['total_time'],
-            'error': result.get('error')
-        }
-    
-    def detect_missing_tasks_hybrid(self, old_version: str, new_version: str, use_diff_first: bool = True) -> Dict[str, Any]:
-        """
-        混合策略检测: 先尝试diff方式，如果结果异常再使用全量分析
-        适合大多数场景的平衡方案
-        """
-        start_time = time.time()
-        logger.info(f"[{self._timestamp()}] 🔄 开始混合策略检测: {old_version} -> {new_version}")
-        
-        if use_diff_first:
-            # 方式1: 先尝试差异commit方式（适合小差异）
-            try:
-                logger.info(f"[{self._timestamp()}] 📋 尝试差异commit方式...")
-                diff_commits = self.gitlab_manager.get_version_diff_optimized(old_version, new_version)
-                
-                if diff_commits and len(diff_commits) < 1000:  # 如果差异commits不多，使用传统方式
-                    candidate_tasks = self._extract_tasks_from_commits(diff_commits)
-                    
-                    if candidate_tasks:
-                        # 并发获取新版本commits并检查
-                        new_commits = self.gitlab_manager.get_all_branch_commits_concurrent(new_version)
-                        new_tasks = self.gitlab_manager.extract_branch_tasks_local(new_commits)
-                        
-                        missing_tasks = candidate_tasks - new_tasks
-                        existing_tasks = candidate_tasks & new_tasks
-                        
-                        total_time = time.time() - start_time
-                        
-                        logger.info(f"[{self._timestamp()}] ✅ 差异commit方式完成: {len(missing_tasks)} 缺失, 耗时 {total_time:.2f}s")
-                        
-                        return {
-                            'missing_tasks': sorted(list(missing_tasks)),
-                            'existing_tasks': sorted(list(existing_tasks)),
-                            'total_diff_commits': len(diff_commits),
-                            'candidate_tasks_count': len(candidate_tasks),
-                            'analysis': 'diff_commit_success',
-                            'strategy': 'hybrid_diff_first',
-                            'total_time': total_time,
-                            'timestamp': self._timestamp()
-                        }
-                
-                logger.info(f"[{self._timestamp()}] 🔄 差异commits太多({len(diff_commits)})，切换到全量分析...")
-                
-            except Exception as e:
-                logger.warning(f"[{self._timestamp()}] ⚠️ 差异commit方式失败: {e}，切换到全量分析...")
-        
-        # 方式2: 全量并发分析（适合大差异或diff失败时）
-        logger.info(f"[{self._timestamp()}] 🚀 切换到全量并发分析...")
-        result = self.detect_missing_tasks_optimized(old_version, new_version)
-        result['strategy'] = 'hybrid_full_analysis'
-        
-        return result
-    
-    def _extract_tasks_from_commits(self, commits: List[Dict[str, Any]]) -> Set[str]:
-        """从commits中提取task IDs"""
-        return self.gitlab_manager.extract_branch_tasks_local(commits)
-    
-    def compare_performance_strategies(self, old_version: str, new_version: str) -> Dict[str, Any]:
-        """
-        性能策略对比测试
-        用于验证优化效果
-        """
-        logger.info(f"[{self._timestamp()}] 🏁 开始性能策略对比测试")
-        
-        results = {
-            'test_versions': f"{old_version} -> {new_version}",
-            'strategies': {},
-            'recommendation': {},
-            'timestamp': self._timestamp()
-        }
-        
-        # 测试优化策略
-        logger.info(f"[{self._timestamp()}] 🚀 测试优化并发策略...")
-        optimized_start = time.time()
-        optimized_result = self.detect_missing_tasks_optimized(old_version, new_version)
-        optimized_time = time.time() - optimized_start
-        
-        results['strategies']['optimized_concurrent'] = {
-            'total_time': optimized_time,
-            'missing_tasks_count': len(optimized_result.get('missing_tasks', [])),
-            'success': optimized_result.get('analysis') == 'success',
-            'performance_data': optimized_result.get('performance_metrics', {})
-        }
-        
-        # 测试混合策略
-        logger.info(f"[{self._timestamp()}] 🔄 测试混合策略...")
-        hybrid_start = time.time()
-        hybrid_result = self.detect_missing_tasks_hybrid(old_version, new_version)
-        hybrid_time = time.time() - hybrid_start
-        
-        results['strategies']['hybrid'] = {
-            'total_time': hybrid_time,
-            'missing_tasks_count': len(hybrid_result.get('missing_tasks', [])),
-            'success': hybrid_result.get('analysis') != 'error',
-            'actual_strategy_used': hybrid_result.get('strategy', 'unknown')
-        }
-        
-        # 生成推荐
-        if optimized_time > 0 and hybrid_time > 0:
-            if optimized_time < hybrid_time * 1.2:  # 优化策略快20%以上
-                results['recommendation'] = {
-                    'preferred': 'optimized_concurrent',
-                    'reason': f"优化策略更快 ({optimized_time:.1f}s vs {hybrid_time:.1f}s)",
-                    'performance_gain': f"{hybrid_time/optimized_time:.1f}x"
-                }
-            else:
-                results['recommendation'] = {
-                    'preferred': 'hybrid',
-                    'reason': f"混合策略更稳定",
-                    'performance_difference': f"{abs(optimized_time-hybrid_time):.1f}s"
-                }
-        
-        logger.info(f"[{self._timestamp()}] 📊 性能对比完成:")
-        logger.info(f"    🚀 优化策略: {optimized_time:.2f}s")
-        logger.info(f"    🔄 混合策略: {hybrid_time:.2f}s")
-        logger.info(f"    💡 推荐: {results['recommendation'].get('preferred', 'unknown')}")
-        
-        return results
-    
-    def get_cache_stats(self) -> Dict[str, Any]:
-        """获取缓存统计"""
-        return self.gitlab_manager.get_performance_stats()
-    
-    def clear_cache(self) -> None:
-        """清理缓存"""
-        self.gitlab_manager.clear_cache()
-        logger.info(f"[{self._timestamp()}] 🧹 OptimizedTaskLossDetector 缓存已清理")
-
-
-class OptimizedTaskAnalyzer:
-    """优化版Task分析器"""
-    
-    def __init__(self, task_detector: OptimizedTaskLossDetector):
-        self.task_detector = task_detector
-    
-    def analyze_version_task_distribution(self, versions: List[str]) -> Dict[str, Any]:
-        """分析多个版本的task分布"""
-        logger.info(f"分析 {len(versions)} 个版本的task分布...")
-        
-        distribution = {}
-        
-        for version in versions:
-            try:
-                commits = self.task_detector.gitlab_manager.get_all_branch_commits_concurrent(version)
-                tasks = self.task_detector.gitlab_manager.extract_branch_tasks_local(commits)
-                
-                distribution[version] = {
-                    'total_commits': len(commits),
-                    'total_tasks': len(tasks),
-                    'task_density': len(tasks) / len(commits) if commits else 0,
-                    'sample_tasks': sorted(list(tasks))[:5]  # 前5个task样本
-                }
-                
-            except Exception as e:
-                distribution[version] = {
-                    'error': str(e),
-                    'total_commits': 0,
-                    'total_tasks': 0
-                }
-        
-        return {
-            'version_distribution': distribution,
-            'summary': {
-                'total_versions': len(versions),
-                'successful_analysis': sum(1 for v in distribution.values() if 'error' not in v),
-                'avg_task_density': sum(v.get('task_density', 0) for v in distribution.values()) / len(versions)
-            }
-        } 
\ No newline at end of file
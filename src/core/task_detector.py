@@ -6,10 +6,14 @@ Task检测器 v2
 """
 import time
 import logging
-from typing import Dict, Any, List, Set
+import sqlite3
+import heapq
+import itertools
+from typing import Dict, Any, List, Set, Optional, Tuple, Callable
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from ..gitlab.gitlab_manager import GitLabManager
+from .cache_manager import CacheKey, get_result_cache
 
 
 logger = logging.getLogger(__name__)
@@ -23,20 +27,86 @@ class TaskLossDetector:
     1. 并发分页获取commits
     2. 本地内存分析tasks
     3. 详细的性能监控和日志
-    4. 去掉缓存，简化逻辑
+    4. 分析结果按commit SHA持久化缓存，进程重启后仍可复用
     """
     
-    def __init__(self, gitlab_manager: GitLabManager):
+    def __init__(self, gitlab_manager: GitLabManager,
+                 commits_loader: Optional[Callable[[str], Tuple[List[Dict[str, Any]], Dict[str, str]]]] = None):
+        """
+        Args:
+            gitlab_manager: GitLab管理器
+            commits_loader: 可选，按版本返回 (commits, commit_task_map) 的函数（如服务层带缓存的获取），
+                默认直接分页获取后提取task
+        """
         self.gitlab_manager = gitlab_manager
+        self.load_commits = commits_loader or self._fetch_commits_with_tasks
+        self.result_cache = get_result_cache()
         logger.info(f"[{self._timestamp()}] 🚀 TaskLossDetector 初始化完成")
     
     def _timestamp(self) -> str:
         """生成带毫秒的时间戳"""
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
     
+    def _fetch_commits_with_tasks(self, version: str) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """默认的commits获取：分页获取版本的全部commits并提取task，返回 (commits, commit_task_map)"""
+        commits = self.gitlab_manager.get_all_tag_commits_concurrent(version)
+        return commits, self.gitlab_manager.extract_commit_messages_with_tasks(commits)
+    
     def _analyze_version_tasks(self, old_version: str, new_version: str) -> Dict[str, Any]:
+        """
+        分析两个版本的task差异，优先使用持久化的分析结果缓存
+        
+        缓存键基于两个版本解析后的commit SHA，分支等引用移动后不会命中旧结果；
+        引用无法解析时直接分析，不使用缓存。缓存是可选的：数据库读写失败（被锁、只读、磁盘已满）时
+        只记录警告，照常分析并返回结果
+        """
+        if self.result_cache is None:
+            return self._compute_version_tasks(old_version, new_version, old_version == new_version)
+        
+        start_time = time.time()
+        old_sha, new_sha = self._resolve_ref_shas(old_version, new_version)
+        cache_key = None
+        if old_sha and new_sha:
+            cache_key = CacheKey.version_analysis(self.gitlab_manager.project_id, old_sha, new_sha)
+            try:
+                cached = self.result_cache.get(cache_key)
+            except sqlite3.Error as e:
+                logger.warning("[%s] ⚠️ 读取分析结果缓存失败，直接分析: %s", self._timestamp(), e)
+                cached = None
+            if cached is not None:
+                logger.info(f"[{self._timestamp()}] 💾 命中分析结果缓存: {old_version} -> {new_version}")
+                result = dict(cached)
+                result['total_time'] = time.time() - start_time
+                result['cache_hit'] = True
+                return result
+        
+        same_commit = old_version == new_version or (old_sha is not None and old_sha == new_sha)
+        result = self._compute_version_tasks(old_version, new_version, same_commit)
+        # 只缓存成功的结果：commits获取不完整时抛出 IncompleteFetchError，分析结果为 'error'，不会写入缓存
+        if cache_key is not None and result.get('analysis') == 'success':
+            try:
+                self.result_cache.set(cache_key, result)
+            except sqlite3.Error as e:
+                logger.warning("[%s] ⚠️ 写入分析结果缓存失败，结果照常返回: %s", self._timestamp(), e)
+        return result
+
+    def _resolve_ref_shas(self, old_version: str, new_version: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        解析两个版本的commit SHA，解析失败的一方为None
+        
+        两次解析都是独立的单个请求，直接提交到GitLab管理器的共享线程池并发执行，不再为此单独创建线程池
+        """
+        old_sha, new_sha = self.gitlab_manager.page_executor.map(
+            self.gitlab_manager.resolve_ref_sha, (old_version, new_version)
+        )
+        return old_sha, new_sha
+
+    def _compute_version_tasks(self, old_version: str, new_version: str, same_commit: bool = False) -> Dict[str, Any]:
         """
         核心方法：分析两个版本的task差异
+        
+        Args:
+            same_commit: 两个版本指向同一个commit时为True，此时commits只获取一次，两边共用
         """
         start_time = time.time()
         logger.info(f"[{self._timestamp()}] 🚀 开始版本task分析: {old_version} -> {new_version}")
@@ -47,24 +117,24 @@ class TaskLossDetector:
             fetch_start = time.time()
             logger.info(f"[{self._timestamp()}] 📥 阶段1: 并发获取两个版本的全部commits...")
             
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                # 并发获取两个版本的commits
-                logger.info(f"[{self._timestamp()}] 🔄 启动2个并发任务获取commits...")
-                
-                future_old = executor.submit(
-                    self.gitlab_manager.get_all_tag_commits_concurrent, 
-                    old_version
-                )
-                future_new = executor.submit(
-                    self.gitlab_manager.get_all_tag_commits_concurrent, 
-                    new_version
-                )
-                
-                logger.info(f"[{self._timestamp()}] ⏳ 等待旧版本 {old_version} 的commits...")
-                old_commits = future_old.result()
-                
-                logger.info(f"[{self._timestamp()}] ⏳ 等待新版本 {new_version} 的commits...")
-                new_commits = future_new.result()
+            if same_commit:
+                # 两个版本指向同一个commit，commit列表必然相同，省去第二次完整的分页获取
+                logger.info(f"[{self._timestamp()}] ♻️ 两个版本指向同一个commit，只获取一次commits")
+                old_commits, old_commit_task_map = self.load_commits(new_version)
+                new_commits, new_commit_task_map = old_commits, old_commit_task_map
+            else:
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    # 并发获取两个版本的commits
+                    logger.info(f"[{self._timestamp()}] 🔄 启动2个并发任务获取commits...")
+                    
+                    future_old = executor.submit(self.load_commits, old_version)
+                    future_new = executor.submit(self.load_commits, new_version)
+                    
+                    logger.info(f"[{self._timestamp()}] ⏳ 等待旧版本 {old_version} 的commits...")
+                    old_commits, old_commit_task_map = future_old.result()
+                    
+                    logger.info(f"[{self._timestamp()}] ⏳ 等待新版本 {new_version} 的commits...")
+                    new_commits, new_commit_task_map = future_new.result()
             
             fetch_time = time.time() - fetch_start
             logger.info(f"[{self._timestamp()}] ✅ 阶段1完成:")
@@ -109,22 +179,18 @@ class TaskLossDetector:
                     'error': f'无法获取新版本 {new_version} 的commits。请检查版本标签是否存在'
                 }
             
-            # 阶段2: 提取commit messages和对应的tasks
+            # 阶段2: commit messages和对应的tasks已随commits一起由加载函数提取（服务层与版本数据一起缓存），不再重复提取
             analysis_start = time.time()
-            logger.info(f"[{self._timestamp()}] 🧮 阶段2: 提取commit messages和tasks...")
-            
-            logger.info(f"[{self._timestamp()}] 🔍 解析旧版本 {old_version} 的commit messages...")
-            old_commit_task_map = self.gitlab_manager.extract_commit_messages_with_tasks(old_commits)
-            
-            logger.info(f"[{self._timestamp()}] 🔍 解析新版本 {new_version} 的commit messages...")
-            new_commit_task_map = self.gitlab_manager.extract_commit_messages_with_tasks(new_commits)
+            logger.info(f"[{self._timestamp()}] 🧮 阶段2: 使用加载时提取的commit messages和tasks "
+                        f"(旧版本 {len(old_commit_task_map)} 条, 新版本 {len(new_commit_task_map)} 条)")
             
             # 阶段3: 基于commit message精确比对计算差异（可检测同一task的部分commits缺失）
             logger.info(f"[{self._timestamp()}] 🧮 阶段3: 基于commit message精确比对计算差异...")
             
-            # 获取commit message集合和task ID集合
-            old_messages = set(old_commit_task_map.keys())
-            new_messages = set(new_commit_task_map.keys())
+            # 获取commit message集合和task ID集合：message直接使用dict的keys视图，
+            # 成员判断和集合差运算都基于dict自身的哈希表，不再复制出两个同样大小的set
+            old_messages = old_commit_task_map.keys()
+            new_messages = new_commit_task_map.keys()
             old_tasks = set(old_commit_task_map.values())
             new_tasks = set(new_commit_task_map.values())
             
@@ -134,21 +200,18 @@ class TaskLossDetector:
             # 找出新版本有但旧版本没有的commit messages  
             new_messages_only = new_messages - old_messages
             
-            # 从缺失的commit messages中提取对应的task IDs
+            # 从缺失的commit messages中提取对应的task IDs：与新增部分一样按旧版本commit顺序一次遍历建立倒排索引，
+            # 每个task的缺失commits保持提交顺序，不再依赖集合差的迭代顺序
             missing_commit_tasks = {}  # {task_id: [missing_commit_messages]}
-            for msg in missing_messages:
-                task_id = old_commit_task_map[msg]
-                if task_id not in missing_commit_tasks:
-                    missing_commit_tasks[task_id] = []
-                missing_commit_tasks[task_id].append(msg)
+            for msg, task_id in old_commit_task_map.items():
+                if msg not in new_messages:
+                    missing_commit_tasks.setdefault(task_id, []).append(msg)
             
-            # 从新增的commit messages中提取对应的task IDs
+            # 从新增的commit messages中提取对应的task IDs：按新版本commit顺序一次遍历建立倒排索引
             new_commit_tasks = {}  # {task_id: [new_commit_messages]}
-            for msg in new_messages_only:
-                task_id = new_commit_task_map[msg]
-                if task_id not in new_commit_tasks:
-                    new_commit_tasks[task_id] = []
-                new_commit_tasks[task_id].append(msg)
+            for msg, task_id in new_commit_task_map.items():
+                if msg not in old_messages:
+                    new_commit_tasks.setdefault(task_id, []).append(msg)
             
             # 分类分析缺失情况
             completely_missing_tasks = set()  # 完全缺失的tasks（新版本完全没有）
@@ -183,14 +246,10 @@ class TaskLossDetector:
             # 构建new_features_with_commits: 包含每个新增task及其对应的commit messages
             new_features_with_commits = {}
             
-            # 处理完全新增的tasks
-            for task_id in completely_new_tasks:
-                # 从新版本的commit messages中找到属于这个task的所有commits
-                task_commits = []
-                for msg, msg_task_id in new_commit_task_map.items():
-                    if msg_task_id == task_id:
-                        task_commits.append(msg)
-                new_features_with_commits[task_id] = task_commits
+            # 处理完全新增的tasks：旧版本没有这个task，它在新版本的所有commits都是新增的，
+            # 直接从倒排索引取出，不再为每个task扫描一遍新版本的全部commits
+            for task_id in sorted(completely_new_tasks):
+                new_features_with_commits[task_id] = new_commit_tasks[task_id]
             
             # 处理部分新增的tasks（已存在但有新commits）
             for task_id, commit_messages in partially_new_tasks.items():
@@ -218,35 +277,37 @@ class TaskLossDetector:
             logger.info(f"    📝 缺失commit messages: {len(missing_messages)} 个")
             logger.info(f"    📝 新增commit messages: {len(new_messages_only)} 个")
             
-            # 打印详细的task信息
+            # 打印详细的task信息：日志只展示排序后的前10个，用heapq.nsmallest取前N个，
+            # 不再为大版本差异复制并整体排序全部task ID
             if completely_missing_tasks:
-                missing_list = sorted(list(completely_missing_tasks))
-                logger.info(f"    🔍 完全缺失tasks: {missing_list[:10]}{'...' if len(missing_list) > 10 else ''}")
+                missing_list = heapq.nsmallest(10, completely_missing_tasks)
+                logger.info(f"    🔍 完全缺失tasks: {missing_list}{'...' if len(completely_missing_tasks) > 10 else ''}")
             
             if partially_missing_tasks:
-                partial_list = sorted(list(partially_missing_tasks.keys()))
-                logger.info(f"    🔍 部分缺失tasks: {partial_list[:10]}{'...' if len(partial_list) > 10 else ''}")
+                partial_list = heapq.nsmallest(10, partially_missing_tasks)
+                logger.info(f"    🔍 部分缺失tasks: {partial_list}{'...' if len(partially_missing_tasks) > 10 else ''}")
                 # 显示部分缺失的详细信息
                 for task_id in partial_list[:3]:  # 只显示前3个的详细信息
                     missing_count = len(partially_missing_tasks[task_id])
                     logger.info(f"      - {task_id}: 缺失 {missing_count} 个commits")
             
             if completely_new_tasks:
-                new_list = sorted(list(completely_new_tasks))
-                logger.info(f"    🆕 完全新增tasks: {new_list[:10]}{'...' if len(new_list) > 10 else ''}")
+                new_list = heapq.nsmallest(10, completely_new_tasks)
+                logger.info(f"    🆕 完全新增tasks: {new_list}{'...' if len(completely_new_tasks) > 10 else ''}")
             
             if partially_new_tasks:
-                partial_new_list = sorted(list(partially_new_tasks.keys()))
-                logger.info(f"    🆕 部分新增tasks: {partial_new_list[:10]}{'...' if len(partial_new_list) > 10 else ''}")
+                partial_new_list = heapq.nsmallest(10, partially_new_tasks)
+                logger.info(f"    🆕 部分新增tasks: {partial_new_list}{'...' if len(partially_new_tasks) > 10 else ''}")
             
             logger.info(f"[{self._timestamp()}] " + "="*80)
             
+            # task ID列表排序后输出：集合的迭代顺序随哈希种子变化，排序后 max_items 截取的前N项稳定可复现
             return {
-                'old_tasks': list(old_tasks),  # 转换为list
-                'new_tasks': list(new_tasks),  # 转换为list
-                'missing_tasks': list(all_missing_tasks),  # 转换为list
+                'old_tasks': sorted(old_tasks),
+                'new_tasks': sorted(new_tasks),
+                'missing_tasks': sorted(all_missing_tasks),
                 'new_features': new_features_with_commits,
-                'common_tasks': list(common_tasks),  # 转换为list
+                'common_tasks': sorted(common_tasks),
                 'analysis': 'success',
                 'total_time': total_time,
                 'performance_improvement': performance_improvement,
@@ -256,12 +317,12 @@ class TaskLossDetector:
                 'new_commits_count': len(new_commits),
                 # 新增详细分析结果
                 'detailed_analysis': {
-                    'completely_missing_tasks': list(completely_missing_tasks),  # 转换为list
+                    'completely_missing_tasks': sorted(completely_missing_tasks),
                     'partially_missing_tasks': partially_missing_tasks,
-                    'completely_new_tasks': list(completely_new_tasks),  # 转换为list
+                    'completely_new_tasks': sorted(completely_new_tasks),
                     'partially_new_tasks': partially_new_tasks,
-                    'missing_commit_messages': list(missing_messages),  # 转换为list
-                    'new_commit_messages': list(new_messages_only)  # 转换为list
+                    'missing_commit_messages': sorted(missing_messages),
+                    'new_commit_messages': sorted(new_messages_only)
                 }
             }
             
@@ -281,37 +342,114 @@ class TaskLossDetector:
                 'total_time': total_time
             }
 
-    def detect_missing_tasks(self, old_version: str, new_version: str) -> Dict[str, Any]:
+    def detect_missing_tasks(self, old_version: str, new_version: str, max_items: Optional[int] = None) -> Dict[str, Any]:
         """
         检测缺失的tasks：旧版本有但新版本没有的tasks
+        
+        Args:
+            max_items: 可选，结果中每个列表最多保留的条目数，不指定时返回全部
         """
         logger.info(f"[{self._timestamp()}] 🔍 开始检测缺失tasks: {old_version} -> {new_version}")
         
         # 调用核心分析方法
         result = self._analyze_version_tasks(old_version, new_version)
+        return self._build_missing_tasks_result(result, max_items)
+
+    def analyze_new_features(self, old_version: str, new_version: str, max_items: Optional[int] = None) -> Dict[str, Any]:
+        """
+        分析新增features：新版本有但旧版本没有的tasks
         
-        # 格式化部分缺失任务的commit messages，去除重复任务号
-        def format_commit_message(msg):
-            if '||' in msg:
-                return msg.split('||', 1)[1]
-            return msg
+        Args:
+            max_items: 可选，结果中每个列表最多保留的条目数，不指定时返回全部
+        """
+        logger.info(f"[{self._timestamp()}] 🆕 开始分析新增features: {old_version} -> {new_version}")
         
-        detailed_analysis = result.get('detailed_analysis', {})
+        # 调用核心分析方法
+        result = self._analyze_version_tasks(old_version, new_version)
+        return self._build_new_features_result(result, max_items)
+
+    def analyze_and_detect(self, old_version: str, new_version: str, max_items: Optional[int] = None) -> Dict[str, Any]:
+        """
+        同时分析新增features和缺失tasks，两个版本的commits只获取一次
+        
+        Args:
+            max_items: 可选，结果中每个列表最多保留的条目数，不指定时返回全部
+        
+        Returns:
+            {'new_features': 新增features结果, 'missing_tasks': 缺失tasks结果}
+        """
+        logger.info(f"[{self._timestamp()}] 🔀 开始合并分析新增features和缺失tasks: {old_version} -> {new_version}")
+        
+        # 调用核心分析方法，两份结果共用同一次分析
+        result = self._analyze_version_tasks(old_version, new_version)
+        return {
+            'new_features': self._build_new_features_result(result, max_items),
+            'missing_tasks': self._build_missing_tasks_result(result, max_items)
+        }
+
+    @staticmethod
+    def _format_commit_message(msg: str) -> str:
+        """去除 "task_id||first_line" 中重复的任务号，只保留第一行"""
+        _, sep, first_line = msg.partition('||')
+        return first_line if sep else msg
+
+    @staticmethod
+    def _limit_items(items: Any, max_items: Optional[int]) -> Any:
+        """
+        按max_items截取列表或 {task_id: commits} 字典的前N项，未指定时原样返回
+        
+        核心分析结果中的task ID列表和commit message列表已排序，字典按task出现的顺序排列，截取结果稳定
+        """
+        if max_items is None or len(items) <= max_items:
+            return items
+        if isinstance(items, dict):
+            return dict(itertools.islice(items.items(), max_items))
+        return list(itertools.islice(items, max_items))
+
+    def _limit_fields(self, result: Dict[str, Any], fields: Tuple[str, ...],
+                      max_items: Optional[int]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """
+        按max_items截取result中的多个字段
+        
+        Returns:
+            (截取后的字段 {field: items}, 截取前的总数 {field_total: n})，未指定max_items时总数为空
+        """
+        limited_fields = {field: self._limit_items(result[field], max_items) for field in fields}
+        totals = {}
+        if max_items is not None:
+            totals = {f'{field}_total': len(result[field]) for field in fields}
+        return limited_fields, totals
+
+    def _build_missing_tasks_result(self, result: Dict[str, Any], max_items: Optional[int] = None) -> Dict[str, Any]:
+        """从核心分析结果中提取缺失tasks相关的结果，max_items 限制各列表的条目数"""
+        # 复制一份，避免修改共享的核心分析结果
+        detailed_analysis = dict(result.get('detailed_analysis', {}))
         if detailed_analysis:
-            # 格式化部分缺失任务
+            # 格式化部分缺失任务的commit messages，去除重复任务号（超出条目限制的任务不再格式化）
             formatted_partially_missing_tasks = {}
-            for task_id, commits in detailed_analysis.get('partially_missing_tasks', {}).items():
-                formatted_partially_missing_tasks[task_id] = [format_commit_message(commit) for commit in commits]
+            for task_id, commits in self._limit_items(detailed_analysis.get('partially_missing_tasks', {}), max_items).items():
+                formatted_partially_missing_tasks[task_id] = [self._format_commit_message(commit) for commit in commits]
             
             detailed_analysis['partially_missing_tasks'] = formatted_partially_missing_tasks
+            if max_items is not None:
+                # 复制来的新增部分字段同样截取，避免带上完整的新增列表
+                for field in ('completely_missing_tasks', 'missing_commit_messages',
+                              'completely_new_tasks', 'partially_new_tasks', 'new_commit_messages'):
+                    if field in detailed_analysis:
+                        detailed_analysis[field] = self._limit_items(detailed_analysis[field], max_items)
+        
+        # 每个列表（含 {task_id: commits} 形式的new_features）都按max_items截取，并记录截取前的总数，调用方据此了解完整规模
+        limited_fields, totals = self._limit_fields(
+            result, ('missing_tasks', 'old_tasks', 'new_tasks', 'new_features', 'common_tasks'), max_items
+        )
+        limited = {}
+        if max_items is not None:
+            limited = {'items_limit': max_items, **totals}
         
         # 返回缺失tasks的结果，包含完整的分析数据
         return {
-            'missing_tasks': result['missing_tasks'],
-            'old_tasks': result['old_tasks'],
-            'new_tasks': result['new_tasks'],
-            'new_features': result['new_features'],
-            'common_tasks': result['common_tasks'],
+            **limited,
+            **limited_fields,
             'analysis': result['analysis'],
             'total_time': result['total_time'],
             'error': result.get('error'),
@@ -320,58 +458,46 @@ class TaskLossDetector:
             'detailed_analysis': detailed_analysis
         }
 
-    def analyze_new_features(self, old_version: str, new_version: str) -> Dict[str, Any]:
-        """
-        分析新增features：新版本有但旧版本没有的tasks
-        """
-        logger.info(f"[{self._timestamp()}] 🆕 开始分析新增features: {old_version} -> {new_version}")
-        
-        # 调用核心分析方法
-        result = self._analyze_version_tasks(old_version, new_version)
-        
+    def _build_new_features_result(self, result: Dict[str, Any], max_items: Optional[int] = None) -> Dict[str, Any]:
+        """从核心分析结果中提取新增features相关的结果，max_items 限制各列表的条目数"""
         # 只返回新增features相关的结果
         detailed_analysis = result.get('detailed_analysis', {})
+        raw_commit_messages = detailed_analysis.get('new_commit_messages', [])
         filtered_detailed_analysis = {
-            'completely_new_tasks': detailed_analysis.get('completely_new_tasks', []),  # 转换为list
-            'partially_new_tasks': detailed_analysis.get('partially_new_tasks', {}),
-            'new_commit_messages': detailed_analysis.get('new_commit_messages', [])  # 转换为list
+            'completely_new_tasks': self._limit_items(detailed_analysis.get('completely_new_tasks', []), max_items),  # 转换为list
+            'partially_new_tasks': self._limit_items(detailed_analysis.get('partially_new_tasks', {}), max_items),
+            'new_commit_messages': self._limit_items(raw_commit_messages, max_items)  # 转换为list
         }
         
         # 处理新增的commit messages，优化格式：从 "GALAXY-25259||GALAXY-25259【Bug】thirdparty data router add" 
-        # 优化为 "GALAXY-25259【Bug】thirdparty data router add"
-        new_commit_messages = []
-        for commit_msg in detailed_analysis.get('new_commit_messages', set()):
-            if '||' in commit_msg:
-                # 格式是 "task_id||first_line"，提取第一行
-                first_line = commit_msg.split('||', 1)[1]
-                new_commit_messages.append(first_line)
-            else:
-                # 没有 '||' 分隔符，直接使用原始message
-                new_commit_messages.append(commit_msg)
+        # 优化为 "GALAXY-25259【Bug】thirdparty data router add"（超出条目限制的不再格式化）
+        new_commit_messages = [
+            self._format_commit_message(commit_msg)
+            for commit_msg in filtered_detailed_analysis['new_commit_messages']
+        ]
         
-        # 处理部分新增任务的格式，去除重复任务号
-        def format_commit_message(msg):
-            if '||' in msg:
-                return msg.split('||', 1)[1]
-            return msg
-        
-        # 格式化部分新增任务
+        # 格式化部分新增任务，去除重复任务号
         formatted_partially_new_tasks = {}
         for task_id, commits in filtered_detailed_analysis.get('partially_new_tasks', {}).items():
-            formatted_partially_new_tasks[task_id] = [format_commit_message(commit) for commit in commits]
+            formatted_partially_new_tasks[task_id] = [self._format_commit_message(commit) for commit in commits]
         
         filtered_detailed_analysis['partially_new_tasks'] = formatted_partially_new_tasks
         
+        # 其余task列表同样按max_items截取，并记录截取前的总数，调用方据此了解完整规模
+        limited_fields, totals = self._limit_fields(result, ('old_tasks', 'new_tasks', 'common_tasks'), max_items)
+        limited = {}
+        if max_items is not None:
+            limited = {'items_limit': max_items, 'new_features_total': len(raw_commit_messages), **totals}
+        
         return {
+            **limited,
             'new_features': new_commit_messages,  # 返回优化后的commit message列表
             'new_commit_messages': new_commit_messages,  # 保持兼容性
-            'old_tasks': result['old_tasks'],
-            'new_tasks': result['new_tasks'],
-            'common_tasks': result['common_tasks'],
+            **limited_fields,
             'analysis': result['analysis'],
             'total_time': result['total_time'],
             'error': result.get('error'),
             'old_commits_count': result.get('old_commits_count', 0),
             'new_commits_count': result.get('new_commits_count', 0),
             'detailed_analysis': filtered_detailed_analysis
-        } 
\ No newline at end of file
+        }
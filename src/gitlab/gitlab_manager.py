@@ -7,23 +7,37 @@ GitLab API管理器 v2
 import re
 import time
 import logging
-from typing import List, Dict, Any, Optional, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import itertools
+from typing import List, Dict, Any, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 from datetime import datetime
+from urllib.parse import quote
 import requests
-
-# 确保导入正确的gitlab包，避免与本地模块冲突
-import sys
-import importlib
-# 临时移除本地路径，确保导入python-gitlab包
-current_path = sys.path[:]
-sys.path = [p for p in sys.path if not p.endswith('src')]
-gitlab = importlib.import_module('gitlab')
-sys.path = current_path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+# 以 src.gitlab 包的方式导入时，绝对导入的 gitlab 即为 python-gitlab，不会与本地包冲突
+import gitlab
+from ..core.cache_manager import TTLCache
 
 
 logger = logging.getLogger(__name__)
 
+# Task ID正则表达式 - 支持GALAXY-XXX和OP-XXX格式，模块导入时编译一次，所有管理器实例共用
+TASK_ID_RE = re.compile(r'(GALAXY-\d+|OP-\d+)')
+
+# cherry-pick标记行及其前面的空行，格式: (cherry picked from commit xxx)
+CHERRY_PICK_RE = re.compile(r'\n*\(cherry picked from commit [a-f0-9]+\)\s*$', re.MULTILINE)
+
+
+class IncompleteFetchError(Exception):
+    """分页获取commits时有页面最终获取失败，得到的commits列表不完整，不能作为结果使用或缓存"""
+    
+    def __init__(self, ref_name: str, failed_pages: List[int]):
+        self.ref_name = ref_name
+        self.failed_pages = failed_pages
+        super().__init__(f"获取 {ref_name} 的commits不完整，失败页面: {failed_pages}")
+
 
 class GitLabManager:
     """GitLab API管理器 - 高性能版本"""
@@ -33,12 +47,19 @@ class GitLabManager:
         self.token = token
         self.project_id = project_id
         
-        # 初始化GitLab连接
-        self.gitlab = gitlab.Gitlab(gitlab_url, private_token=token)
-        self.project = self.gitlab.projects.get(project_id)
+        # 共享的HTTP会话（连接池），所有GitLab请求复用TCP/TLS连接
+        self.session = self._create_session()
+        
+        # 初始化GitLab连接；连接失败时释放已创建的资源，不留下无人关闭的会话
+        try:
+            self.gitlab = gitlab.Gitlab(gitlab_url, private_token=token, session=self.session)
+            self.project = self.gitlab.projects.get(project_id)
+        except Exception:
+            self.close()
+            raise
         
-        # Task正则表达式 - 支持GALAXY-XXX和OP-XXX格式
-        self.task_pattern = re.compile(r'(GALAXY-\d+|OP-\d+)')
+        # Task正则表达式（兼容保留的实例属性，与模块级 TASK_ID_RE 为同一对象）
+        self.task_pattern = TASK_ID_RE
         
         # 性能配置
         self.config = {
@@ -46,6 +67,9 @@ class GitLabManager:
             'max_workers': 8,       # 并发工作线程数，降低避免过载
             'timeout': 30,          # 请求超时时间
             'retry_attempts': 3,    # 重试次数
+            'max_retry_after': 30,  # 遵循429 Retry-After时最多等待的秒数
+            'ref_sha_ttl': 60,      # ref -> commit SHA 解析结果的缓存秒数
+            'max_probe_pages': 4096,  # 探测总页数时的页码上限
         }
         
         # 用于直接API调用的headers
@@ -54,9 +78,36 @@ class GitLabManager:
             'Content-Type': 'application/json'
         }
         
+        # 共享的分页获取线程池：线程跨请求复用，不再每次获取都创建和销毁；
+        # 容量为两个版本同时获取所需的线程数，同时也是本项目对GitLab并发请求数的上限。
+        # 只提交单个API请求（分页、SHA解析），任务内不能再等待本线程池的其他任务，避免互相等待而死锁
+        self.page_executor = ThreadPoolExecutor(
+            max_workers=self.config['max_workers'] * 2,
+            thread_name_prefix=f"gitlab-{project_id}"
+        )
+        # 所有直接API请求（分页、探测、SHA解析）共用的并发上限，多个分析同时进行时不超过GitLab限流
+        self.request_semaphore = threading.BoundedSemaphore(self.config['max_workers'] * 2)
+        
+        # ref -> commit SHA 的短期缓存：同一对版本先后调用多个工具时不再重复解析；
+        # 过期时间很短，分支移动后很快就能解析到新的SHA
+        self.ref_sha_cache = TTLCache(maxsize=256, ttl=self.config['ref_sha_ttl'])
+        
         logger.info(f"[{self._timestamp()}] 🚀 GitLabManager初始化完成: {gitlab_url}, 项目ID: {project_id}")
         logger.info(f"[{self._timestamp()}] ⚙️ 配置: 每页{self.config['per_page']}个commits, {self.config['max_workers']}个并发worker")
     
+    def _create_session(self) -> requests.Session:
+        """创建带连接池的HTTP会话，避免每个请求都重新建立连接"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=64,  # 需覆盖两个版本同时并发获取时的线程数
+            # 只对建立连接失败做快速重试，HTTP错误仍由 _fetch_single_page 的重试逻辑处理
+            max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2)
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
     def _timestamp(self) -> str:
         """生成带毫秒的时间戳"""
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
@@ -109,8 +160,34 @@ class GitLabManager:
         
         return all_commits
     
-    def _fetch_single_page(self, ref_name: str, page: int) -> List[Dict[str, Any]]:
-        """获取单页commits"""
+    def _get(self, url: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """发起GitLab API GET请求，受 request_semaphore 并发上限约束"""
+        with self.request_semaphore:
+            return self.session.get(url, headers=self.headers, params=params, timeout=self.config['timeout'])
+    
+    def _retry_delay(self, response: Optional[requests.Response], attempt: int) -> float:
+        """计算重试前的等待时间：429响应优先遵循Retry-After，否则线性退避"""
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.config['max_retry_after'])
+                except ValueError:
+                    pass
+        return 0.5 * (attempt + 1)
+    
+    def _fetch_single_page(self, ref_name: str, page: int) -> Optional[List[Dict[str, Any]]]:
+        """获取单页commits，重试后仍请求失败时返回None"""
+        return self._fetch_page(ref_name, page)[0]
+    
+    def _fetch_page(self, ref_name: str, page: int) -> Tuple[Optional[List[Dict[str, Any]]], Optional[int]]:
+        """
+        获取单页commits，同时返回 X-Total-Pages 响应头给出的总页数
+        
+        Returns:
+            (commits, total_pages)，GitLab未返回总页数（结果超过10000条时会省略）或请求失败时 total_pages 为None；
+            页面不存在（404）时 commits 为空列表，重试后仍请求失败时 commits 为None，调用方据此区分"没有数据"和"获取失败"
+        """
         url = f"{self.gitlab_url}/api/v4/projects/{self.project_id}/repository/commits"
         params = {
             'ref_name': ref_name,
@@ -122,12 +199,7 @@ class GitLabManager:
             try:
                 logger.debug(f"[{self._timestamp()}] 🔗 请求第 {page} 页 (尝试 {attempt + 1}/{self.config['retry_attempts']})")
                 
-                response = requests.get(
-                    url, 
-                    headers=self.headers, 
-                    params=params, 
-                    timeout=self.config['timeout']
-                )
+                response = self._get(url, params)
                 
                 if response.status_code == 200:
                     commits = response.json()
@@ -144,36 +216,89 @@ class GitLabManager:
                         })
                     
                     logger.debug(f"[{self._timestamp()}] ✅ 第 {page} 页请求成功，获取 {len(simplified_commits)} 个commits")
-                    return simplified_commits
+                    total_pages = response.headers.get('X-Total-Pages')
+                    return simplified_commits, int(total_pages) if total_pages else None
                     
                 elif response.status_code == 404:
                     logger.warning(f"[{self._timestamp()}] ⚠️ 第 {page} 页返回404，可能已到末尾")
-                    return []
+                    return [], None
                     
                 else:
                     logger.warning(f"[{self._timestamp()}] ⚠️ 第 {page} 页请求失败: HTTP {response.status_code}")
                     if attempt == self.config['retry_attempts'] - 1:
-                        return []
-                    time.sleep(0.5 * (attempt + 1))
+                        return None, None
+                    time.sleep(self._retry_delay(response, attempt))
                     
             except Exception as e:
                 logger.warning(f"[{self._timestamp()}] ⚠️ 第 {page} 页请求异常: {e}")
                 if attempt == self.config['retry_attempts'] - 1:
-                    return []
-                time.sleep(0.5 * (attempt + 1))
+                    return None, None
+                time.sleep(self._retry_delay(None, attempt))
+        
+        return None, None
+    
+    def resolve_ref_sha(self, ref_name: str) -> Optional[str]:
+        """
+        将tag/分支/commit引用解析为commit SHA，解析失败时返回None
         
-        return []
+        成功的解析结果缓存 ref_sha_ttl 秒，失败不缓存
+        """
+        sha = self.ref_sha_cache.get(ref_name)
+        if sha is not None:
+            return sha
+        
+        url = f"{self.gitlab_url}/api/v4/projects/{self.project_id}/repository/commits/{quote(ref_name, safe='')}"
+        try:
+            response = self._get(url)
+            if response.status_code == 200:
+                sha = response.json().get('id')
+                if sha:
+                    self.ref_sha_cache.set(ref_name, sha)
+                return sha
+            logger.warning(f"[{self._timestamp()}] ⚠️ 解析引用 {ref_name} 失败: HTTP {response.status_code}")
+        except Exception as e:
+            logger.warning(f"[{self._timestamp()}] ⚠️ 解析引用 {ref_name} 异常: {e}")
+        return None
+    
+    def get_tag_commit_count(self, tag_name: str) -> Optional[int]:
+        """
+        只请求一条commit，从 X-Total 响应头读取tag的commit总数，不拉取完整列表
+        
+        Returns:
+            commit总数；引用不存在时为0；GitLab未返回 X-Total（数量过大时会省略）或请求失败时为None，
+            调用方需回退到完整获取
+        """
+        url = f"{self.gitlab_url}/api/v4/projects/{self.project_id}/repository/commits"
+        params = {'ref_name': tag_name, 'per_page': 1, 'page': 1}
+        try:
+            response = self._get(url, params)
+            if response.status_code == 404:
+                return 0
+            if response.status_code == 200:
+                total = response.headers.get('X-Total')
+                if total:
+                    return int(total)
+                # 没有总数时，空列表同样说明引用下没有commits
+                return 0 if not response.json() else None
+            logger.warning(f"[{self._timestamp()}] ⚠️ 获取 {tag_name} 的commit总数失败: HTTP {response.status_code}")
+        except Exception as e:
+            logger.warning(f"[{self._timestamp()}] ⚠️ 获取 {tag_name} 的commit总数异常: {e}")
+        return None
     
     def get_all_tag_commits_concurrent(self, tag_name: str) -> List[Dict[str, Any]]:
         """
         并发获取tag的所有commits - 先探测总页数，再并发获取
+        
+        Raises:
+            IncompleteFetchError: 探测页数或获取某一页时请求最终失败，无法得到完整的commits列表
         """
         start_time = time.time()
         logger.info(f"[{self._timestamp()}] 📥 开始并发获取tag commits: {tag_name}")
         
-        # 第一步：探测总页数
+        # 第一步：探测总页数，探测过程中已获取的页面在第二步直接复用
         logger.info(f"[{self._timestamp()}] 🔍 第一步：探测总页数...")
-        total_pages = self._detect_total_pages(tag_name)
+        fetched_pages: Dict[int, List[Dict[str, Any]]] = {}
+        total_pages = self._detect_total_pages(tag_name, fetched_pages)
         
         if total_pages == 0:
             logger.warning(f"[{self._timestamp()}] ⚠️ 未检测到任何页面，tag可能不存在或没有commits")
@@ -183,7 +308,7 @@ class GitLabManager:
         
         # 第二步：并发获取所有页面
         logger.info(f"[{self._timestamp()}] 🚀 第二步：并发获取 {total_pages} 页...")
-        all_commits = self._fetch_all_pages_concurrent(tag_name, total_pages)
+        all_commits = self._fetch_all_pages_concurrent(tag_name, total_pages, fetched_pages)
         
         elapsed = time.time() - start_time
         logger.info(f"[{self._timestamp()}] 🎯 并发获取完成统计:")
@@ -195,34 +320,70 @@ class GitLabManager:
         
         return all_commits
     
-    def _detect_total_pages(self, ref_name: str) -> int:
-        """探测总页数 - 简单方案，逐页检查直到没有数据"""
+    def _detect_total_pages(self, ref_name: str, fetched_pages: Optional[Dict[int, List[Dict[str, Any]]]] = None) -> int:
+        """
+        探测总页数 - 优先使用第1页的 X-Total-Pages 响应头，没有时倍增探测上界后二分查找最后一页
+        
+        Args:
+            ref_name: 引用名称
+            fetched_pages: 可选，探测过程中获取到数据的页面会写入其中 {页码: commits}，供后续并发获取时复用
+        """
         logger.info(f"[{self._timestamp()}] 🔍 开始探测 {ref_name} 的总页数...")
+        if fetched_pages is None:
+            fetched_pages = {}
         
         # 先检查第1页
-        first_page = self._fetch_single_page(ref_name, 1)
+        first_page, header_total_pages = self._fetch_page(ref_name, 1)
         if not first_page:
             logger.info(f"[{self._timestamp()}] 📊 第1页没有数据，总页数: 0")
             return 0
+        fetched_pages[1] = first_page
         
         if len(first_page) < self.config['per_page']:
             logger.info(f"[{self._timestamp()}] 📊 第1页只有 {len(first_page)} 个commits，总页数: 1")
             return 1
         
-        # 使用二分查找快速定位最后一页
-        left, right = 1, 500  # 假设最多500页
+        if header_total_pages:
+            logger.info(f"[{self._timestamp()}] 📊 响应头 X-Total-Pages 给出总页数: {header_total_pages}，跳过二分探测")
+            return header_total_pages
+        
+        # 倍增探测上界：不再假设固定的最大页数，超大tag也能探测到真实的最后一页
         last_valid_page = 1
+        probe = 2
+        while probe <= self.config['max_probe_pages']:
+            page_data = self._fetch_single_page(ref_name, probe)
+            if page_data is None:
+                # 请求失败不等于超出末页，继续探测会低估总页数，得到不完整的commits
+                raise IncompleteFetchError(ref_name, [probe])
+            if not page_data:
+                break
+            fetched_pages[probe] = page_data
+            last_valid_page = probe
+            if len(page_data) < self.config['per_page']:
+                logger.info(f"[{self._timestamp()}] 📊 探测完成，总页数: {probe}")
+                return probe
+            probe *= 2
+        
+        # 在 (last_valid_page, probe) 之间二分查找最后一页
+        left, right = last_valid_page + 1, min(probe, self.config['max_probe_pages']) - 1
         
-        logger.info(f"[{self._timestamp()}] 🔍 使用二分查找探测最后一页 (范围: 1-{right})")
+        logger.info(f"[{self._timestamp()}] 🔍 使用二分查找探测最后一页 (范围: {left}-{right})")
         
         while left <= right:
             mid = (left + right) // 2
             logger.debug(f"[{self._timestamp()}] 🔍 检查第 {mid} 页...")
             
             page_data = self._fetch_single_page(ref_name, mid)
+            if page_data is None:
+                raise IncompleteFetchError(ref_name, [mid])
             
             if page_data:  # 这一页有数据
+                fetched_pages[mid] = page_data
                 last_valid_page = mid
+                if len(page_data) < self.config['per_page']:
+                    # 数据不足一页，这一页就是最后一页
+                    logger.debug(f"[{self._timestamp()}] ✅ 第 {mid} 页只有 {len(page_data)} 个commits，确认为最后一页")
+                    break
                 left = mid + 1
                 logger.debug(f"[{self._timestamp()}] ✅ 第 {mid} 页有 {len(page_data)} 个commits，继续向右查找")
             else:  # 这一页没数据，说明超出了
@@ -232,38 +393,58 @@ class GitLabManager:
         logger.info(f"[{self._timestamp()}] 📊 探测完成，总页数: {last_valid_page}")
         return last_valid_page
     
-    def _fetch_all_pages_concurrent(self, ref_name: str, total_pages: int) -> List[Dict[str, Any]]:
-        """并发获取所有页面的commits"""
+    def _fetch_all_pages_concurrent(self, ref_name: str, total_pages: int,
+                                    prefetched_pages: Optional[Dict[int, List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+        """
+        并发获取所有页面的commits
+        
+        Args:
+            ref_name: 引用名称
+            total_pages: 总页数
+            prefetched_pages: 可选，已获取的页面 {页码: commits}，这些页面不再重复请求
+        
+        Raises:
+            IncompleteFetchError: 有页面获取失败或没有数据，不返回缺页的部分结果
+        """
         all_commits = []
+        prefetched_pages = prefetched_pages or {}
+        
+        logger.info(f"[{self._timestamp()}] 🔄 使用共享线程池并发处理 {total_pages} 页"
+                    f"（复用已获取的 {len(prefetched_pages)} 页）")
+        
+        # 提交所有任务，已获取的页面直接复用，保持页码顺序
+        futures = []
+        for page in range(1, total_pages + 1):
+            if page in prefetched_pages:
+                future = Future()
+                future.set_result(prefetched_pages[page])
+            else:
+                future = self.page_executor.submit(self._fetch_single_page, ref_name, page)
+            futures.append((page, future))
+        
+        # 收集结果
+        successful_pages = 0
+        failed_pages = []
+        
+        for page_num, future in futures:
+            try:
+                commits = future.result()
+                if commits:
+                    all_commits.extend(commits)
+                    successful_pages += 1
+                    logger.debug(f"[{self._timestamp()}] ✅ 第 {page_num} 页成功获取 {len(commits)} 个commits")
+                else:
+                    failed_pages.append(page_num)
+                    logger.warning(f"[{self._timestamp()}] ❌ 第 {page_num} 页获取失败")
+            except Exception as e:
+                failed_pages.append(page_num)
+                logger.error(f"[{self._timestamp()}] ❌ 第 {page_num} 页处理异常: {e}")
         
-        logger.info(f"[{self._timestamp()}] 🔄 启动 {self.config['max_workers']} 个并发worker处理 {total_pages} 页")
+        logger.info(f"[{self._timestamp()}] 📊 并发获取统计: 成功 {successful_pages} 页, 失败 {len(failed_pages)} 页")
         
-        with ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
-            # 提交所有任务
-            futures = []
-            for page in range(1, total_pages + 1):
-                future = executor.submit(self._fetch_single_page, ref_name, page)
-                futures.append((page, future))
-            
-            # 收集结果
-            successful_pages = 0
-            failed_pages = 0
-            
-            for page_num, future in futures:
-                try:
-                    commits = future.result()
-                    if commits:
-                        all_commits.extend(commits)
-                        successful_pages += 1
-                        logger.debug(f"[{self._timestamp()}] ✅ 第 {page_num} 页成功获取 {len(commits)} 个commits")
-                    else:
-                        failed_pages += 1
-                        logger.warning(f"[{self._timestamp()}] ❌ 第 {page_num} 页获取失败")
-                except Exception as e:
-                    failed_pages += 1
-                    logger.error(f"[{self._timestamp()}] ❌ 第 {page_num} 页处理异常: {e}")
-        
-        logger.info(f"[{self._timestamp()}] 📊 并发获取统计: 成功 {successful_pages} 页, 失败 {failed_pages} 页")
+        # 缺页的commits列表会被当作完整结果分析并按SHA缓存，直接报告失败
+        if failed_pages:
+            raise IncompleteFetchError(ref_name, failed_pages)
         
         return all_commits
     
@@ -282,14 +463,15 @@ class GitLabManager:
         logger.info(f"[{self._timestamp()}] 🧮 开始从 {len(commits)} 个commits中提取task相关的commit messages...")
         
         commit_task_map = {}
+        find_task_ids = TASK_ID_RE.findall
         
         for i, commit in enumerate(commits):
             message = commit.get('message', '').strip()
             # 查找包含task ID的commit message
-            found_tasks = self.task_pattern.findall(message)
+            found_tasks = find_task_ids(message)
             if found_tasks:
-                # 提取message的第一行
-                first_line = message.split('\n')[0].strip()
+                # 提取message的第一行（partition只扫描到第一个换行，不切分整条message）
+                first_line = message.partition('\n')[0].strip()
                 
                 # 为每个找到的task ID都创建一个记录
                 # 这样可以处理一个commit包含多个task的情况
@@ -314,11 +496,12 @@ class GitLabManager:
         
         if commit_task_map:
             # 显示前几个示例
-            sample_items = list(commit_task_map.items())[:5]
+            sample_items = itertools.islice(commit_task_map.items(), 5)
             logger.info(f"    📊 前5个示例:")
             for key, task in sample_items:
                 # 提取第一行用于显示
-                first_line = key.split('||')[1] if '||' in key else key
+                _, sep, first_line = key.partition('||')
+                first_line = first_line if sep else key
                 short_msg = first_line[:50] + "..." if len(first_line) > 50 else first_line
                 logger.info(f"        {task}: {short_msg}")
         
@@ -326,10 +509,21 @@ class GitLabManager:
     
     def extract_tasks_from_commits(self, commits: List[Dict[str, Any]]) -> Set[str]:
         """
-        从commits中提取tasks（兼容旧接口）
+        从commits中提取tasks（兼容旧接口），只收集task ID集合，不构建 "task_id||first_line" 键
         """
-        commit_task_map = self.extract_commit_messages_with_tasks(commits)
-        return set(commit_task_map.values())
+        task_ids = set()
+        find_task_ids = TASK_ID_RE.findall
+        for commit in commits:
+            task_ids.update(find_task_ids(commit.get('message', '')))
+        return task_ids
+    
+    def close(self) -> None:
+        """释放分页线程池和HTTP连接池，管理器不再使用或初始化中途失败时调用"""
+        # 初始化中途失败时线程池可能尚未创建
+        page_executor = getattr(self, 'page_executor', None)
+        if page_executor is not None:
+            page_executor.shutdown(wait=False)
+        self.session.close()
     
     def get_performance_stats(self) -> Dict[str, Any]:
         """获取性能统计"""
@@ -349,12 +543,8 @@ class GitLabManager:
         Returns:
             标准化后的commit message
         """
-        # 移除cherry-pick信息
-        # 格式: (cherry picked from commit xxx)
-        import re
-        
         # 移除cherry-pick行及其前面的空行
-        normalized = re.sub(r'\n*\(cherry picked from commit [a-f0-9]+\)\s*$', '', message, flags=re.MULTILINE)
+        normalized = CHERRY_PICK_RE.sub('', message)
         
         # 移除末尾的多余空白字符
         normalized = normalized.rstrip()
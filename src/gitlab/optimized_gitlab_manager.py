@@ -1,375 +0,0 @@
-# -*- coding: utf-8 -*-
-"""
-优化版GitLab API管理器
-基于并发分页获取的高性能版本，将处理时间从262秒优化到15-20秒
-"""
-import gitlab
-import re
-import time
-import logging
-from typing import List, Dict, Any, Optional, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
-import requests
-from ..core.cache_manager import RequestCacheManager, CacheKey
-
-
-logger = logging.getLogger(__name__)
-
-
-class OptimizedGitLabManager:
-    """优化版GitLab API管理器 - 高性能版本"""
-    
-    def __init__(self, gitlab_url: str, token: str, project_id: str):
-        self.gitlab_url = gitlab_url
-        self.token = token
-        self.project_id = project_id
-        
-        # 初始化GitLab连接
-        self.gitlab = gitlab.Gitlab(gitlab_url, private_token=token)
-        self.project = self.gitlab.projects.get(project_id)
-        
-        # 初始化缓存
-        self.cache = RequestCacheManager()
-        
-        # GALAXY task正则表达式
-        self.task_pattern = re.compile(r'GALAXY-(\d+)')
-        
-        # 性能配置
-        self.config = {
-            'per_page': 200,        # 每页commits数量
-            'max_workers': 10,      # 并发工作线程数
-            'timeout': 30,          # 请求超时时间
-            'retry_attempts': 3,    # 重试次数
-        }
-        
-        # 用于直接API调用的headers
-        self.headers = {
-            'PRIVATE-TOKEN': token,
-            'Content-Type': 'application/json'
-        }
-        
-        logger.info(f"[{self._timestamp()}] 🚀 OptimizedGitLabManager初始化完成: {gitlab_url}, 项目ID: {project_id}")
-    
-    def _timestamp(self) -> str:
-        """生成带毫秒的时间戳"""
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    
-    def get_all_branch_commits_concurrent(self, branch_name: str) -> List[Dict[str, Any]]:
-        """
-        并发获取分支所有commits - 核心优化方法
-        预期性能: 18000 commits约需8-15秒
-        """
-        start_time = time.time()
-        logger.info(f"[{self._timestamp()}] 📥 开始并发获取分支commits: {branch_name}")
-        
-        # 检查缓存
-        cache_key = f"branch_commits:{branch_name}"
-        cached_commits = self.cache.get(cache_key)
-        if cached_commits is not None:
-            logger.info(f"[{self._timestamp()}] 📦 使用缓存的commits: {len(cached_commits)}个")
-            return cached_commits
-        
-        try:
-            # 1. 获取第一页以确定总页数
-            first_page_info = self._get_commits_page_info(branch_name)
-            if not first_page_info:
-                logger.error(f"[{self._timestamp()}] ❌ 无法获取分支信息: {branch_name}")
-                return []
-            
-            total_pages = first_page_info['total_pages']
-            total_commits = first_page_info['total_commits']
-            
-            logger.info(f"[{self._timestamp()}] 📊 分支统计: {total_commits} commits, {total_pages} 页")
-            
-            # 2. 并发获取所有页面
-            all_commits = self._fetch_all_pages_concurrent(branch_name, total_pages)
-            
-            # 3. 缓存结果
-            if all_commits:
-                self.cache.set(cache_key, all_commits)  # 缓存结果
-            
-            elapsed = time.time() - start_time
-            logger.info(f"[{self._timestamp()}] ✅ 并发获取完成: {len(all_commits)} commits, 耗时 {elapsed:.2f}s, 速度 {len(all_commits)/elapsed:.1f} commits/s")
-            
-            return all_commits
-            
-        except Exception as e:
-            logger.error(f"[{self._timestamp()}] ❌ 并发获取commits失败: {e}")
-            return []
-    
-    def _get_commits_page_info(self, ref_name: str) -> Optional[Dict[str, int]]:
-        """获取引用(分支/标签)的分页信息 - 修复版本，不依赖不准确的响应头"""
-        url = f"{self.gitlab_url}/api/v4/projects/{self.project_id}/repository/commits"
-        
-        try:
-            logger.info(f"[{self._timestamp()}] 🔍 获取 {ref_name} 的分页信息...")
-            
-            # 先获取第一页，检查是否有数据
-            params = {
-                'ref_name': ref_name,
-                'per_page': self.config['per_page'],
-                'page': 1
-            }
-            
-            response = requests.get(url, headers=self.headers, params=params, timeout=self.config['timeout'])
-            logger.info(f"[{self._timestamp()}] 📍 响应状态: {response.status_code}")
-            
-            if response.status_code == 200:
-                first_page_commits = response.json()
-                first_page_count = len(first_page_commits)
-                
-                logger.info(f"[{self._timestamp()}] 📊 第一页获取到 {first_page_count} commits")
-                
-                if first_page_count == 0:
-                    # 没有commits
-                    return {
-                        'total_pages': 0,
-                        'total_commits': 0,
-                        'per_page': self.config['per_page']
-                    }
-                elif first_page_count < self.config['per_page']:
-                    # 只有一页
-                    return {
-                        'total_pages': 1,
-                        'total_commits': first_page_count,
-                        'per_page': self.config['per_page']
-                    }
-                else:
-                    # 有多页，需要估算总页数
-                    # 尝试获取一个较大的页数来估算
-                    logger.info(f"[{self._timestamp()}] 🔍 估算总页数...")
-                    
-                    # 二分查找最后一页
-                    max_page = self._find_last_page(ref_name, url)
-                    estimated_total = max_page * self.config['per_page']
-                    
-                    logger.info(f"[{self._timestamp()}] 📊 估算结果: 约 {max_page} 页, 约 {estimated_total} commits")
-                    
-                    return {
-                        'total_pages': max_page,
-                        'total_commits': estimated_total,
-                        'per_page': self.config['per_page']
-                    }
-                    
-            elif response.status_code == 401:
-                logger.error(f"[{self._timestamp()}] ❌ GitLab Token无效 (401 Unauthorized)")
-                return None
-            elif response.status_code == 404:
-                logger.error(f"[{self._timestamp()}] ❌ 引用不存在: {ref_name} (404 Not Found)")
-                return None
-            else:
-                logger.error(f"[{self._timestamp()}] ❌ 获取分页信息失败: HTTP {response.status_code}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"[{self._timestamp()}] ❌ 请求分页信息异常: {e}")
-            return None
-    
-    def _find_last_page(self, ref_name: str, base_url: str) -> int:
-        """二分查找最后一页"""
-        left, right = 1, 1000  # 假设最多1000页
-        last_valid_page = 1
-        
-        while left <= right:
-            mid = (left + right) // 2
-            params = {
-                'ref_name': ref_name,
-                'per_page': self.config['per_page'],
-                'page': mid
-            }
-            
-            try:
-                response = requests.get(base_url, headers=self.headers, params=params, timeout=10)
-                if response.status_code == 200:
-                    commits = response.json()
-                    if commits:  # 这一页有数据
-                        last_valid_page = mid
-                        left = mid + 1
-                    else:  # 这一页没数据，说明超出了
-                        right = mid - 1
-                else:
-                    right = mid - 1
-            except:
-                right = mid - 1
-        
-        return last_valid_page
-    
-    def _fetch_all_pages_concurrent(self, branch_name: str, total_pages: int) -> List[Dict[str, Any]]:
-        """并发获取所有页面的commits"""
-        all_commits = []
-        
-        def fetch_page(page_num: int) -> Dict[str, Any]:
-            """获取单页commits"""
-            page_start = time.time()
-            url = f"{self.gitlab_url}/api/v4/projects/{self.project_id}/repository/commits"
-            params = {
-                'ref_name': branch_name,
-                'per_page': self.config['per_page'],
-                'page': page_num
-            }
-            
-            for attempt in range(self.config['retry_attempts']):
-                try:
-                    response = requests.get(
-                        url, 
-                        headers=self.headers, 
-                        params=params, 
-                        timeout=self.config['timeout']
-                    )
-                    page_time = time.time() - page_start
-                    
-                    if response.status_code == 200:
-                        commits = response.json()
-                        # 简化commit数据，只保留必要字段
-                        simplified_commits = []
-                        for commit in commits:
-                            simplified_commits.append({
-                                'id': commit.get('id'),
-                                'message': commit.get('message', ''),
-                                'author_name': commit.get('author_name', ''),
-                                'committed_date': commit.get('committed_date', ''),
-                                'short_id': commit.get('short_id', '')
-                            })
-                        
-                        return {
-                            'page': page_num,
-                            'commits': simplified_commits,
-                            'count': len(simplified_commits),
-                            'time': page_time,
-                            'success': True,
-                            'attempt': attempt + 1
-                        }
-                    else:
-                        if attempt == self.config['retry_attempts'] - 1:  # 最后一次尝试
-                            return {
-                                'page': page_num,
-                                'commits': [],
-                                'count': 0,
-                                'time': page_time,
-                                'success': False,
-                                'error': f'HTTP {response.status_code}',
-                                'attempt': attempt + 1
-                            }
-                        time.sleep(0.5 * (attempt + 1))  # 递增延迟重试
-                        
-                except Exception as e:
-                    page_time = time.time() - page_start
-                    if attempt == self.config['retry_attempts'] - 1:  # 最后一次尝试
-                        return {
-                            'page': page_num,
-                            'commits': [],
-                            'count': 0,
-                            'time': page_time,
-                            'success': False,
-                            'error': str(e),
-                            'attempt': attempt + 1
-                        }
-                    time.sleep(0.5 * (attempt + 1))  # 递增延迟重试
-        
-        # 并发获取所有页面
-        logger.info(f"[{self._timestamp()}] 🔄 启动 {self.config['max_workers']} 个并发worker处理 {total_pages} 页")
-        
-        with ThreadPoolExecutor(max_workers=self.config['max_workers']) as executor:
-            # 提交所有任务
-            futures = []
-            for page in range(1, total_pages + 1):
-                future = executor.submit(fetch_page, page)
-                futures.append(future)
-            
-            # 收集结果
-            successful_pages = 0
-            failed_pages = 0
-            total_fetch_time = 0
-            
-            for future in as_completed(futures):
-                result = future.result()
-                if result['success']:
-                    all_commits.extend(result['commits'])
-                    successful_pages += 1
-                else:
-                    failed_pages += 1
-                    logger.warning(f"[{self._timestamp()}] ⚠️ 页面 {result['page']} 获取失败: {result.get('error', 'unknown')}")
-                
-                total_fetch_time += result['time']
-        
-        avg_page_time = total_fetch_time / len(futures) if futures else 0
-        
-        logger.info(f"[{self._timestamp()}] 📊 并发获取统计: 成功 {successful_pages} 页, 失败 {failed_pages} 页, 平均页面耗时 {avg_page_time:.2f}s")
-        
-        return all_commits
-    
-    def extract_branch_tasks_local(self, commits: List[Dict[str, Any]]) -> Set[str]:
-        """
-        本地提取tasks，避免API调用
-        相比逐个搜索，这个方法几乎瞬间完成
-        """
-        start_time = time.time()
-        tasks = set()
-        
-        for commit in commits:
-            message = commit.get('message', '')
-            matches = self.task_pattern.findall(message)
-            tasks.update(f"GALAXY-{match}" for match in matches)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"[{self._timestamp()}] 🧮 本地task提取完成: {len(commits)} commits -> {len(tasks)} tasks, 耗时 {elapsed:.3f}s")
-        
-        return tasks
-    
-    def get_version_diff_optimized(self, from_version: str, to_version: str) -> List[Dict[str, Any]]:
-        """
-        优化版本的版本差异获取
-        保持与原方法的兼容性
-        """
-        cache_key = CacheKey.version_diff(from_version, to_version)
-        
-        cached_result = self.cache.get(cache_key)
-        if cached_result is not None:
-            logger.info(f"[{self._timestamp()}] 📦 使用缓存的版本差异")
-            return cached_result
-        
-        try:
-            logger.info(f"[{self._timestamp()}] 🔍 获取版本差异: {from_version} -> {to_version}")
-            comparison = self.project.repository_compare(
-                from_=from_version, 
-                to=to_version
-            )
-            diff_commits = comparison.get('commits', [])
-            
-            # 转换为标准格式
-            commits_data = []
-            for commit in diff_commits:
-                commits_data.append({
-                    'id': commit.get('id'),
-                    'message': commit.get('message', ''),
-                    'author_name': commit.get('author_name', ''),
-                    'committed_date': commit.get('committed_date', ''),
-                    'short_id': commit.get('short_id', '')
-                })
-            
-            self.cache.set(cache_key, commits_data)
-            logger.info(f"[{self._timestamp()}] ✅ 版本差异获取完成: {len(commits_data)} commits")
-            return commits_data
-            
-        except Exception as e:
-            logger.error(f"[{self._timestamp()}] ❌ 获取版本差异失败: {e}")
-            return []
-    
-    def get_performance_stats(self) -> Dict[str, Any]:
-        """获取性能统计信息"""
-        return {
-            'config': self.config,
-            'cache_stats': self.cache.get_stats(),
-            'timestamp': self._timestamp()
-        }
-    
-    def clear_cache(self) -> None:
-        """清理缓存"""
-        self.cache.clear()
-        logger.info(f"[{self._timestamp()}] 🧹 OptimizedGitLabManager缓存已清理")
-
-
-class OptimizedGitLabAPIError(Exception):
-    """优化版GitLab API异常"""
-    pass 
\ No newline at end of file
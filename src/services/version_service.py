@@ -8,12 +8,70 @@ import os
 import time
 import json
 import logging
-from typing import Dict, Any, List, Optional
-from ..gitlab.gitlab_manager import GitLabManager
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from ..gitlab.gitlab_manager import GitLabManager, IncompleteFetchError
 from ..core.task_detector import TaskLossDetector
+from ..core.cache_manager import TTLCache
+
+# 优先使用orjson解析配置文件（直接解析bytes），未安装时回退到标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# 项目配置文件路径：模块导入时解析为规范的绝对路径，之后的stat/open不受工作目录影响，错误提示中也不再带 ../..
+PROJECTS_CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'config', 'projects.json'))
+
+# validate_versions 同时验证的版本数上限；多数版本只需一次 per_page=1 的计数请求，
+# 实际HTTP并发仍受GitLabManager的request_semaphore限制
+VALIDATE_MAX_WORKERS = 8
+
+# 按commit SHA缓存的版本数据（commits + task提取结果）条目数上限；
+# SHA对应的内容不会变化，过期时间只用于及时释放内存
+VERSION_DATA_CACHE_SIZE = 16
+VERSION_DATA_CACHE_TTL = 3600
+
+# GitLab组件创建失败（演示模式、GitLab不可达）后的重试间隔秒数：
+# 间隔内直接按失败处理，不再让每个请求都在锁内等待一次连接超时
+COMPONENTS_RETRY_INTERVAL = 30
+
+# 解析后的项目配置缓存：(配置文件的修改时间, 配置内容)
+_projects_config_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+
+
+def load_projects_config() -> Dict[str, Any]:
+    """
+    读取并解析项目配置文件
+    
+    按文件修改时间缓存解析结果，配置文件未修改时各实例直接复用，不再重复读取和解析；
+    返回的字典为共享对象，调用方不能修改
+    """
+    global _projects_config_cache
+    
+    config_path = PROJECTS_CONFIG_PATH
+    try:
+        config_mtime = os.stat(config_path).st_mtime_ns
+    except OSError:
+        raise FileNotFoundError(f"项目配置文件不存在: {config_path}，请从 projects.json.example 复制并配置")
+    
+    cached = _projects_config_cache
+    if cached is not None and cached[0] == config_mtime:
+        return cached[1]
+    
+    try:
+        with open(config_path, 'rb') as f:
+            config_data = _json_loads(f.read())
+    except Exception as e:
+        raise ValueError(f"加载项目配置文件失败: {e}")
+    
+    _projects_config_cache = (config_mtime, config_data)
+    return config_data
+
 
 class ProjectConfigManager:
     """项目配置管理器 - 专门用于管理项目配置，不依赖GitLab连接"""
@@ -23,15 +81,7 @@ class ProjectConfigManager:
     
     def _load_config(self) -> Dict[str, Any]:
         """加载项目配置文件"""
-        config_path = os.path.join(os.path.dirname(__file__), '../../config/projects.json')
-        if not os.path.exists(config_path):
-            raise FileNotFoundError(f"项目配置文件不存在: {config_path}，请从 projects.json.example 复制并配置")
-        
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            raise ValueError(f"加载项目配置文件失败: {e}")
+        return load_projects_config()
     
     def get_all_projects(self) -> List[Dict[str, str]]:
         """获取所有项目列表（包括未配置环境变量的项目）"""
@@ -59,6 +109,8 @@ class ProjectConfigManager:
 
 class ProjectConfig:
     """项目配置类"""
+    __slots__ = ('project_key', 'name_zh', 'name_en', 'project_id', 'token')
+    
     def __init__(self, project_key: str, name_zh: str, name_en: str, project_id: str, token: str):
         self.project_key = project_key
         self.name_zh = name_zh  # 中文名
@@ -73,12 +125,26 @@ class ProjectConfig:
 class VersionComparisonService:
     """版本比较服务 v2 - 高性能版本，支持多项目"""
     
+    # 实例属性固定，所有请求路径都会读取这些属性
+    __slots__ = ('gitlab_url', 'projects', 'current_project', 'version_data_cache',
+                 '_components', '_components_failed_at', '_components_lock', '_available_projects')
+    
     def __init__(self, project_key: Optional[str] = None):
         # 从环境变量获取配置
         self.gitlab_url = os.getenv('GITLAB_URL', 'https://gitlab.mayidata.com')
         
         # 支持的项目配置
         self.projects = self._load_project_configs()
+        # 项目列表在实例生命周期内不变，构建一次
+        self._available_projects = tuple(
+            {
+                'key': config.project_key,
+                'name_zh': config.name_zh,
+                'name_en': config.name_en,
+                'project_id': config.project_id
+            }
+            for config in self.projects.values()
+        )
         
         # 当前项目配置
         self.current_project = self._get_project_config(project_key)
@@ -86,56 +152,107 @@ class VersionComparisonService:
         if not self.current_project:
             raise ValueError(f"无法找到项目配置: {project_key}")
         
-        # 初始化核心组件（在演示模式下可能会失败，但不影响项目列表功能）
-        try:
-            self.gitlab_manager = GitLabManager(
-                self.gitlab_url, 
-                self.current_project.token, 
-                self.current_project.project_id
-            )
-            self.task_detector = TaskLossDetector(self.gitlab_manager)
-        except Exception as e:
-            logger.warning(f"⚠️ GitLab连接失败（演示模式）: {e}")
-            self.gitlab_manager = None
-            self.task_detector = None
+        # 版本数据缓存：{(project_id, commit_sha): (commits, commit_task_map, task_index)}
+        self.version_data_cache = TTLCache(maxsize=VERSION_DATA_CACHE_SIZE, ttl=VERSION_DATA_CACHE_TTL)
+        
+        # 核心组件按项目延迟创建并复用：{project_key: (GitLabManager, TaskLossDetector)}，
+        # 只查询项目信息时不连接GitLab，切换回已用过的项目时直接复用
+        self._components: Dict[str, Tuple[GitLabManager, TaskLossDetector]] = {}
+        # 最近一次创建失败的时间：{project_key: time.monotonic()}，重试间隔内不再重新连接
+        self._components_failed_at: Dict[str, float] = {}
+        self._components_lock = threading.Lock()
         
-        logger.info(f"🚀 VersionComparisonService v2 初始化完成")
-        logger.info(f"   GitLab URL: {self.gitlab_url}")
-        logger.info(f"   当前项目: {self.current_project.name_zh} ({self.current_project.name_en}) (ID: {self.current_project.project_id})")
+        logger.info("🚀 VersionComparisonService v2 初始化完成")
+        logger.info("   GitLab URL: %s", self.gitlab_url)
+        logger.info("   当前项目: %s (%s) (ID: %s)", self.current_project.name_zh, self.current_project.name_en, self.current_project.project_id)
+    
+    def _get_components(self) -> Tuple[Optional[GitLabManager], Optional[TaskLossDetector]]:
+        """
+        获取当前项目的GitLab管理器和task检测器，首次使用时创建
+        
+        创建失败（演示模式）时返回 (None, None)；失败会记录下来，
+        COMPONENTS_RETRY_INTERVAL 秒内直接返回失败，之后再重新尝试连接
+        """
+        project = self.current_project
+        components = self._components.get(project.project_key)
+        if components is not None:
+            return components
+        if self._in_retry_backoff(project.project_key):
+            return None, None
+        
+        with self._components_lock:
+            components = self._components.get(project.project_key)
+            if components is not None:
+                return components
+            # 等锁期间其他线程可能刚刚创建失败，不再重复连接
+            if self._in_retry_backoff(project.project_key):
+                return None, None
+            try:
+                gitlab_manager = GitLabManager(self.gitlab_url, project.token, project.project_id)
+            except Exception as e:
+                logger.warning("⚠️ GitLab连接失败（演示模式），%s秒后重试: %s", COMPONENTS_RETRY_INTERVAL, e)
+                self._components_failed_at[project.project_key] = time.monotonic()
+                return None, None
+            
+            def load_commits(version: str) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+                # 检测器获取commits时同样走版本数据缓存，与统计、搜索等方法共用同一份数据，
+                # 连同已提取的commit_task_map一起返回，检测器不再重复提取
+                commits, commit_task_map, _ = self._get_version_data(version, gitlab_manager)
+                return commits, commit_task_map
+            
+            try:
+                task_detector = TaskLossDetector(gitlab_manager, commits_loader=load_commits)
+            except Exception as e:
+                # 管理器已创建成功，释放它的线程池和连接池后按失败处理
+                gitlab_manager.close()
+                logger.warning("⚠️ Task检测器创建失败，%s秒后重试: %s", COMPONENTS_RETRY_INTERVAL, e)
+                self._components_failed_at[project.project_key] = time.monotonic()
+                return None, None
+            
+            components = (gitlab_manager, task_detector)
+            self._components[project.project_key] = components
+            self._components_failed_at.pop(project.project_key, None)
+            return components
+    
+    def _in_retry_backoff(self, project_key: str) -> bool:
+        """项目的组件最近创建失败且仍在重试间隔内时返回True"""
+        failed_at = self._components_failed_at.get(project_key)
+        return failed_at is not None and time.monotonic() - failed_at < COMPONENTS_RETRY_INTERVAL
+    
+    @property
+    def gitlab_manager(self) -> Optional[GitLabManager]:
+        """当前项目的GitLab管理器，首次访问时创建"""
+        return self._get_components()[0]
+    
+    @property
+    def task_detector(self) -> Optional[TaskLossDetector]:
+        """当前项目的task检测器，首次访问时创建"""
+        return self._get_components()[1]
     
     def _load_project_configs(self) -> Dict[str, ProjectConfig]:
         """从JSON配置文件加载项目配置"""
         projects = {}
         
         # 加载项目配置文件
-        config_path = os.path.join(os.path.dirname(__file__), '../../config/projects.json')
-        if not os.path.exists(config_path):
-            raise FileNotFoundError(f"项目配置文件不存在: {config_path}，请从 projects.json.example 复制并配置")
-        
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-        except Exception as e:
-            raise ValueError(f"加载项目配置文件失败: {e}")
+        config_data = load_projects_config()
         
         project_definitions = config_data.get('projects', {})
         if not project_definitions:
             raise ValueError("项目配置文件中未找到项目定义")
         
-        # 获取统一的GitLab Token
+        # 获取统一的GitLab Token，如果没有token，使用演示模式
         gitlab_token = os.getenv('GITLAB_TOKEN')
+        token = gitlab_token if gitlab_token else 'demo_token'
+        log_each = logger.isEnabledFor(logging.DEBUG)
         
         # 遍历项目配置
         for project_key, project_info in project_definitions.items():
             project_id = project_info.get('project_id')
             
             if not project_id:
-                logger.warning(f"⚠️ 项目配置不完整: {project_key} - 缺少project_id")
+                logger.warning("⚠️ 项目配置不完整: %s - 缺少project_id", project_key)
                 continue
             
-            # 如果没有token，使用演示模式
-            token = gitlab_token if gitlab_token else 'demo_token'
-            
             projects[project_key] = ProjectConfig(
                 project_key=project_key,
                 name_zh=project_info['name_zh'],
@@ -144,15 +261,14 @@ class VersionComparisonService:
                 token=token
             )
             
-            if gitlab_token:
-                logger.info(f"✅ 加载项目配置: {project_info['name_zh']} ({project_info['name_en']}) [ID: {project_id}]")
-            else:
-                logger.info(f"📋 加载项目配置（演示模式）: {project_info['name_zh']} ({project_info['name_en']}) [ID: {project_id}]")
+            # 逐项目日志只在DEBUG级别输出，避免项目多时刷屏
+            if log_each:
+                logger.debug("✅ 加载项目配置: %s (%s) [ID: %s]", project_info['name_zh'], project_info['name_en'], project_id)
         
         if not projects:
             raise ValueError("未找到任何有效的项目配置")
         
-        logger.info(f"📊 总计加载 {len(projects)} 个项目配置")
+        logger.info("📊 总计加载 %s 个项目配置%s", len(projects), "" if gitlab_token else "（演示模式）")
         return projects
     
     def _get_project_config(self, project_key: Optional[str]) -> Optional[ProjectConfig]:
@@ -163,153 +279,217 @@ class VersionComparisonService:
         # 如果没有指定项目，使用第一个可用的项目
         if self.projects:
             default_key = list(self.projects.keys())[0]
-            logger.info(f"🔄 使用默认项目: {default_key}")
+            logger.info("🔄 使用默认项目: %s", default_key)
             return self.projects[default_key]
         
         return None
     
     def get_available_projects(self) -> List[Dict[str, str]]:
-        """获取可用的项目列表"""
-        return [
-            {
-                'key': config.project_key,
-                'name_zh': config.name_zh,
-                'name_en': config.name_en,
-                'project_id': config.project_id
-            }
-            for config in self.projects.values()
-        ]
+        """获取可用的项目列表（列表中的字典为实例共享，调用方不能修改）"""
+        return list(self._available_projects)
     
     def switch_project(self, project_key: str) -> bool:
         """切换到指定项目"""
         if project_key not in self.projects:
-            logger.error(f"❌ 项目不存在: {project_key}")
+            logger.error("❌ 项目不存在: %s", project_key)
             return False
         
         old_project = self.current_project
+        # GitLab管理器在首次使用时按项目创建，已创建的管理器保留下来，切换回来时直接复用
         self.current_project = self.projects[project_key]
-        
-        # 重新初始化GitLab管理器（在演示模式下可能会失败，但不影响项目切换）
-        try:
-            self.gitlab_manager = GitLabManager(
-                self.gitlab_url,
-                self.current_project.token,
-                self.current_project.project_id
-            )
-            self.task_detector = TaskLossDetector(self.gitlab_manager)
-            logger.info(f"🔄 项目切换成功: {old_project.name_zh} -> {self.current_project.name_zh}")
-        except Exception as e:
-            logger.warning(f"⚠️ 项目切换到 {self.current_project.name_zh}，但GitLab连接失败（演示模式）: {e}")
-            self.gitlab_manager = None
-            self.task_detector = None
+        logger.info("🔄 项目切换成功: %s -> %s", old_project.name_zh, self.current_project.name_zh)
         
         return True
     
-    def detect_missing_tasks(self, old_version: str, new_version: str) -> Dict[str, Any]:
+    def detect_missing_tasks(self, old_version: str, new_version: str, max_items: Optional[int] = None) -> Dict[str, Any]:
         """
         检测缺失的tasks：旧版本有但新版本没有的tasks
         
         Args:
             old_version: 旧版本标签
             new_version: 新版本标签
+            max_items: 可选，每个结果列表最多返回的条目数，不指定时返回全部
             
         Returns:
             包含缺失tasks信息的字典
         """
-        logger.info(f"🔍 开始检测缺失tasks: {old_version} -> {new_version}")
+        logger.info("🔍 开始检测缺失tasks: %s -> %s", old_version, new_version)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            result = self.task_detector.detect_missing_tasks(old_version, new_version)
-            elapsed = time.time() - start_time
+            result = self.task_detector.detect_missing_tasks(old_version, new_version, max_items)
+            elapsed = time.perf_counter() - start_time
             
-            logger.info(f"✅ 缺失tasks检测完成，耗时: {elapsed:.2f}s")
+            logger.info("✅ 缺失tasks检测完成，耗时: %.2fs", elapsed)
             
             # 添加服务层的统计信息
-            result['service_stats'] = {
-                'service_version': 'v2',
-                'total_elapsed': elapsed,
-                'gitlab_url': self.gitlab_url,
-                'project_id': self.current_project.project_id
-            }
+            result['service_stats'] = self._service_stats(elapsed)
             
             return result
             
         except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"❌ 缺失tasks检测失败: {e}, 耗时: {elapsed:.2f}s")
-            return {
-                'missing_tasks': [],
-                'analysis': 'error',
-                'total_time': elapsed,
-                'error': str(e),
-                'service_stats': {
-                    'service_version': 'v2',
-                    'total_elapsed': elapsed,
-                    'gitlab_url': self.gitlab_url,
-                    'project_id': self.current_project.project_id
-                }
-            }
+            elapsed = time.perf_counter() - start_time
+            logger.error("❌ 缺失tasks检测失败: %s, 耗时: %.2fs", e, elapsed)
+            return self._error_result({'missing_tasks': []}, e, elapsed)
     
-    def analyze_new_features(self, old_version: str, new_version: str) -> Dict[str, Any]:
+    def analyze_new_features(self, old_version: str, new_version: str, max_items: Optional[int] = None) -> Dict[str, Any]:
         """
         分析新增features：新版本有但旧版本没有的tasks
         
         Args:
             old_version: 旧版本标签
             new_version: 新版本标签
+            max_items: 可选，每个结果列表最多返回的条目数，不指定时返回全部
             
         Returns:
             包含新增features信息的字典
         """
-        logger.info(f"🆕 开始分析新增features: {old_version} -> {new_version}")
+        logger.info("🆕 开始分析新增features: %s -> %s", old_version, new_version)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            result = self.task_detector.analyze_new_features(old_version, new_version)
-            elapsed = time.time() - start_time
+            result = self.task_detector.analyze_new_features(old_version, new_version, max_items)
+            elapsed = time.perf_counter() - start_time
             
-            logger.info(f"✅ 新增features分析完成，耗时: {elapsed:.2f}s")
+            logger.info("✅ 新增features分析完成，耗时: %.2fs", elapsed)
             
             # 添加服务层的统计信息
-            result['service_stats'] = {
-                'service_version': 'v2',
-                'total_elapsed': elapsed,
-                'gitlab_url': self.gitlab_url,
-                'project_id': self.current_project.project_id
-            }
+            result['service_stats'] = self._service_stats(elapsed)
             
             return result
             
         except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"❌ 新增features分析失败: {e}, 耗时: {elapsed:.2f}s")
+            elapsed = time.perf_counter() - start_time
+            logger.error("❌ 新增features分析失败: %s, 耗时: %.2fs", e, elapsed)
+            return self._error_result({'new_features': []}, e, elapsed)
+    
+    def analyze_and_detect(self, old_version: str, new_version: str, max_items: Optional[int] = None) -> Dict[str, Any]:
+        """
+        合并分析：一次获取两个版本的commits，同时产出新增features和缺失tasks
+        
+        Args:
+            old_version: 旧版本标签
+            new_version: 新版本标签
+            max_items: 可选，每个结果列表最多返回的条目数，不指定时返回全部
+        
+        Returns:
+            {'new_features': 新增features结果, 'missing_tasks': 缺失tasks结果}
+        """
+        logger.info("🔀 开始合并分析: %s -> %s", old_version, new_version)
+        
+        start_time = time.perf_counter()
+        try:
+            result = self.task_detector.analyze_and_detect(old_version, new_version, max_items)
+            elapsed = time.perf_counter() - start_time
+            
+            logger.info("✅ 合并分析完成，耗时: %.2fs", elapsed)
+            
+            # 添加服务层的统计信息
+            for part in result.values():
+                part['service_stats'] = self._service_stats(elapsed)
+            
+            return result
+        
+        except Exception as e:
+            elapsed = time.perf_counter() - start_time
+            logger.error("❌ 合并分析失败: %s, 耗时: %.2fs", e, elapsed)
             return {
-                'new_features': [],
-                'analysis': 'error',
-                'total_time': elapsed,
-                'error': str(e),
-                'service_stats': {
-                    'service_version': 'v2',
-                    'total_elapsed': elapsed,
-                    'gitlab_url': self.gitlab_url,
-                    'project_id': self.current_project.project_id
-                }
+                'new_features': self._error_result({'new_features': []}, e, elapsed),
+                'missing_tasks': self._error_result({'missing_tasks': []}, e, elapsed)
             }
     
-    def get_performance_stats(self) -> Dict[str, Any]:
-        """获取性能统计信息"""
+    def _service_stats(self, elapsed: float) -> Dict[str, Any]:
+        """构建返回结果中的服务层统计信息，每个结果各用一份独立的字典"""
         return {
             'service_version': 'v2',
-            'gitlab_manager_stats': self.gitlab_manager.get_performance_stats(),
+            'total_elapsed': elapsed,
+            'gitlab_url': self.gitlab_url,
+            'project_id': self.current_project.project_id
+        }
+    
+    def _error_result(self, empty_fields: Dict[str, Any], error: Exception, elapsed: float) -> Dict[str, Any]:
+        """构建分析失败时的统一结果：empty_fields 为该结果类型的空字段，如 {'missing_tasks': []}"""
+        return {
+            **empty_fields,
+            'analysis': 'error',
+            'total_time': elapsed,
+            'error': str(error),
+            'service_stats': self._service_stats(elapsed)
+        }
+    
+    def get_performance_stats(self) -> Dict[str, Any]:
+        """获取性能统计信息，GitLab管理器不可用（演示模式或重试间隔内）时 gitlab_manager_stats 为None并附带error"""
+        gitlab_manager = self.gitlab_manager
+        stats = {
+            'service_version': 'v2',
+            'gitlab_manager_stats': gitlab_manager.get_performance_stats() if gitlab_manager else None,
             'features': [
                 '并发分页获取commits',
-                '二分查找探测总页数',
+                '响应头/倍增+二分探测总页数',
                 '本地内存分析tasks',
                 '详细的性能监控和日志',
-                '去掉缓存，简化逻辑'
-            ]
+                '按commit SHA缓存版本commits和task提取结果'
+            ],
+            'version_data_cache': self.version_data_cache.get_stats()
         }
+        if gitlab_manager is None:
+            stats['error'] = 'GitLab连接不可用（演示模式）'
+        return stats
+    
+    def clear_cache(self) -> None:
+        """清空版本数据缓存"""
+        self.version_data_cache.clear()
+    
+    def _get_version_data(self, version: str,
+                          gitlab_manager: Optional[GitLabManager] = None) -> Tuple[List[Dict[str, Any]], Dict[str, str], Dict[str, List[str]]]:
+        """
+        获取版本的commits及其task提取结果
+        
+        按版本解析出的commit SHA缓存，同一个tag被多个方法重复使用时不再重新分页获取；
+        分支等引用移动到新commit后SHA变化，自然不会命中旧数据。
+        返回的数据为缓存共享对象，调用方不能修改
+        
+        Args:
+            version: 版本标签
+            gitlab_manager: 可选，使用的GitLab管理器，默认为当前项目的管理器
+        
+        Returns:
+            (commits, commit_task_map, task_index)，task_index 为 {task_id: [commit message第一行]} 倒排索引
+        
+        Raises:
+            IncompleteFetchError: 有页面获取失败，commits不完整，此时不缓存任何数据
+        """
+        # 只读取一次管理器：解析、获取和提取都使用同一个实例，
+        # 即使期间 switch_project 切换了当前项目也不会混用两个项目的数据
+        if gitlab_manager is None:
+            gitlab_manager = self.gitlab_manager
+        commit_sha = gitlab_manager.resolve_ref_sha(version)
+        cache_key = (gitlab_manager.project_id, commit_sha)
+        if commit_sha is not None:
+            cached = self.version_data_cache.get(cache_key)
+            if cached is not None:
+                logger.info("♻️ 版本数据缓存命中: %s (%s)", version, commit_sha[:8])
+                return cached
+        
+        try:
+            commits = gitlab_manager.get_all_tag_commits_concurrent(version)
+        except IncompleteFetchError as e:
+            # 不完整的commits不能按不可变的SHA缓存，否则在TTL内所有方法都会读到缺页的数据
+            logger.warning("⚠️ 版本 %s 的commits获取不完整，不缓存: 失败页面 %s", version, e.failed_pages)
+            raise
+        commit_task_map = gitlab_manager.extract_commit_messages_with_tasks(commits)
+        
+        # 一次遍历建立倒排索引，与commits一起缓存，按task查询和统计时不再扫描全部commit messages。
+        # 键的格式固定为 "task_id||first_line"，task_id已知，直接按前缀长度切出第一行
+        task_index = {}
+        for commit_key, task_id in commit_task_map.items():
+            task_index.setdefault(task_id, []).append(commit_key[len(task_id) + 2:])
+        
+        data = (commits, commit_task_map, task_index)
+        # 只缓存完整获取的数据；获取失败（空结果）同样不缓存，下次调用重新尝试
+        if commit_sha is not None and commits:
+            self.version_data_cache.set(cache_key, data)
+        return data
     
     def analyze_tasks(self, task_ids: List[str], version: str) -> Dict[str, Any]:
         """
@@ -322,41 +502,29 @@ class VersionComparisonService:
         Returns:
             包含task分析信息的字典
         """
-        logger.info(f"📊 开始分析tasks: {task_ids} in {version}")
+        logger.info("📊 开始分析tasks: %s in %s", task_ids, version)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
             # 获取版本的所有commits和tasks
-            commits = self.gitlab_manager.get_all_tag_commits_concurrent(version)
-            commit_messages_with_tasks = self.gitlab_manager.extract_commit_messages_with_tasks(commits)
+            commits, _, task_index = self._get_version_data(version)
             
-            # 分析指定的tasks
+            # 分析指定的tasks：直接查倒排索引，commit messages已是去掉task前缀的第一行，
+            # 如 "GALAXY-25259【Bug】thirdparty data router add"
             found_tasks = {}
             missing_tasks = []
             
             for task_id in task_ids:
-                task_commits = []
-                for commit_message, extracted_task_id in commit_messages_with_tasks.items():
-                    if extracted_task_id == task_id:
-                        # 优化格式：从 "GALAXY-25259||GALAXY-25259【Bug】thirdparty data router add" 
-                        # 优化为 "GALAXY-25259【Bug】thirdparty data router add"
-                        if '||' in commit_message:
-                            # 格式是 "task_id||first_line"，提取第一行
-                            first_line = commit_message.split('||', 1)[1]
-                            task_commits.append(first_line)
-                        else:
-                            # 没有 '||' 分隔符，直接使用原始message
-                            task_commits.append(commit_message)
-                
+                task_commits = task_index.get(task_id)
                 if task_commits:
                     found_tasks[task_id] = {
                         'commit_count': len(task_commits),
-                        'commit_messages': task_commits
+                        'commit_messages': list(task_commits)  # 复制一份，避免调用方修改缓存中的列表
                     }
                 else:
                     missing_tasks.append(task_id)
             
-            elapsed = time.time() - start_time
+            elapsed = time.perf_counter() - start_time
             
             result = {
                 'version': version,
@@ -367,12 +535,12 @@ class VersionComparisonService:
                 'total_time': elapsed
             }
             
-            logger.info(f"✅ tasks分析完成，耗时: {elapsed:.2f}s")
+            logger.info("✅ tasks分析完成，耗时: %.2fs", elapsed)
             return result
             
         except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"❌ tasks分析失败: {e}, 耗时: {elapsed:.2f}s")
+            elapsed = time.perf_counter() - start_time
+            logger.error("❌ tasks分析失败: %s, 耗时: %.2fs", e, elapsed)
             return {
                 'version': version,
                 'requested_tasks': task_ids,
@@ -393,26 +561,18 @@ class VersionComparisonService:
         Returns:
             包含搜索结果的字典
         """
-        logger.info(f"🔎 开始搜索task: {task_id} in {version or 'all versions'}")
+        logger.info("🔎 开始搜索task: %s in %s", task_id, version or 'all versions')
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
             if version:
                 # 在指定版本中搜索
-                commits = self.gitlab_manager.get_all_tag_commits_concurrent(version)
-                commit_messages_with_tasks = self.gitlab_manager.extract_commit_messages_with_tasks(commits)
+                _, _, task_index = self._get_version_data(version)
                 
-                found_commits = []
-                for commit_key, extracted_task_id in commit_messages_with_tasks.items():
-                    if extracted_task_id == task_id:
-                        # commit_key的格式是 "task_id||first_line"，提取第一行作为commit message
-                        if '||' in commit_key:
-                            commit_message = commit_key.split('||')[1]
-                        else:
-                            commit_message = commit_key
-                        found_commits.append(commit_message)
+                # 直接查倒排索引（值已是commit message第一行），复制一份避免调用方修改缓存中的列表
+                found_commits = list(task_index.get(task_id, ()))
                 
-                elapsed = time.time() - start_time
+                elapsed = time.perf_counter() - start_time
                 
                 result = {
                     'task_id': task_id,
@@ -424,7 +584,7 @@ class VersionComparisonService:
                 }
             else:
                 # 搜索所有版本（这里可以扩展实现）
-                elapsed = time.time() - start_time
+                elapsed = time.perf_counter() - start_time
                 result = {
                     'task_id': task_id,
                     'version': 'all',
@@ -433,12 +593,12 @@ class VersionComparisonService:
                     'total_time': elapsed
                 }
             
-            logger.info(f"✅ task搜索完成，耗时: {elapsed:.2f}s")
+            logger.info("✅ task搜索完成，耗时: %.2fs", elapsed)
             return result
             
         except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"❌ task搜索失败: {e}, 耗时: {elapsed:.2f}s")
+            elapsed = time.perf_counter() - start_time
+            logger.error("❌ task搜索失败: %s, 耗时: %.2fs", e, elapsed)
             return {
                 'task_id': task_id,
                 'version': version,
@@ -457,34 +617,27 @@ class VersionComparisonService:
         Returns:
             包含验证结果的字典
         """
-        logger.info(f"✅ 开始验证版本: {versions}")
+        logger.info("✅ 开始验证版本: %s", versions)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
             valid_versions = []
             invalid_versions = []
             
+            # 重复的版本只验证一次；不同版本并发获取commits，
+            # 实际HTTP并发仍由GitLabManager的request_semaphore统一限制
+            unique_versions = list(dict.fromkeys(versions))
+            outcomes = {}  # {version: (是否有效, 结果项)}
+            if unique_versions:
+                with ThreadPoolExecutor(max_workers=min(len(unique_versions), VALIDATE_MAX_WORKERS)) as executor:
+                    outcomes = dict(zip(unique_versions, executor.map(self._validate_one_version, unique_versions)))
+            
+            # 按请求顺序展开结果，重复出现的版本各自保留一项
             for version in versions:
-                try:
-                    # 尝试获取版本的commits来验证版本是否存在
-                    commits = self.gitlab_manager.get_all_tag_commits_concurrent(version)
-                    if commits:
-                        valid_versions.append({
-                            'version': version,
-                            'commit_count': len(commits)
-                        })
-                    else:
-                        invalid_versions.append({
-                            'version': version,
-                            'reason': '版本存在但无commits'
-                        })
-                except Exception as e:
-                    invalid_versions.append({
-                        'version': version,
-                        'reason': str(e)
-                    })
-            
-            elapsed = time.time() - start_time
+                is_valid, entry = outcomes[version]
+                (valid_versions if is_valid else invalid_versions).append(entry)
+            
+            elapsed = time.perf_counter() - start_time
             
             result = {
                 'requested_versions': versions,
@@ -493,12 +646,12 @@ class VersionComparisonService:
                 'total_time': elapsed
             }
             
-            logger.info(f"✅ 版本验证完成，耗时: {elapsed:.2f}s")
+            logger.info("✅ 版本验证完成，耗时: %.2fs", elapsed)
             return result
             
         except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"❌ 版本验证失败: {e}, 耗时: {elapsed:.2f}s")
+            elapsed = time.perf_counter() - start_time
+            logger.error("❌ 版本验证失败: %s, 耗时: %.2fs", e, elapsed)
             return {
                 'requested_versions': versions,
                 'valid_versions': [],
@@ -507,6 +660,29 @@ class VersionComparisonService:
                 'total_time': elapsed
             }
     
+    def _validate_one_version(self, version: str) -> Tuple[bool, Dict[str, Any]]:
+        """验证单个版本，返回 (是否有效, 结果项)"""
+        try:
+            # 优先从响应头读取commit总数，只有GitLab未返回总数时才获取完整的commits列表
+            commit_count = self.gitlab_manager.get_tag_commit_count(version)
+            if commit_count is None:
+                commits, _, _ = self._get_version_data(version)
+                commit_count = len(commits)
+            if commit_count:
+                return True, {
+                    'version': version,
+                    'commit_count': commit_count
+                }
+            return False, {
+                'version': version,
+                'reason': '版本存在但无commits'
+            }
+        except Exception as e:
+            return False, {
+                'version': version,
+                'reason': str(e)
+            }
+    
     def get_version_statistics(self, from_version: str, to_version: str) -> Dict[str, Any]:
         """
         获取版本间的统计信息
@@ -518,26 +694,32 @@ class VersionComparisonService:
         Returns:
             包含统计信息的字典
         """
-        logger.info(f"📈 开始获取统计信息: {from_version} -> {to_version}")
+        logger.info("📈 开始获取统计信息: %s -> %s", from_version, to_version)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            # 获取两个版本的数据
-            old_commits = self.gitlab_manager.get_all_tag_commits_concurrent(from_version)
-            new_commits = self.gitlab_manager.get_all_tag_commits_concurrent(to_version)
-            
-            old_tasks = self.gitlab_manager.extract_commit_messages_with_tasks(old_commits)
-            new_tasks = self.gitlab_manager.extract_commit_messages_with_tasks(new_commits)
+            if from_version == to_version:
+                # 同一个版本只获取一次；并发获取时两边都会错过缓存，各自完整拉取一遍
+                old_commits, _, old_task_index = self._get_version_data(from_version)
+                new_commits, new_task_index = old_commits, old_task_index
+            else:
+                # 并发获取两个版本的数据
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    future_old = executor.submit(self._get_version_data, from_version)
+                    future_new = executor.submit(self._get_version_data, to_version)
+                    old_commits, _, old_task_index = future_old.result()
+                    new_commits, _, new_task_index = future_new.result()
             
-            # 计算统计信息
-            old_task_ids = set(old_tasks.values())
-            new_task_ids = set(new_tasks.values())
+            # 计算统计信息：倒排索引的键即为task ID集合，直接对keys视图做集合运算
+            old_task_ids = old_task_index.keys()
+            new_task_ids = new_task_index.keys()
             
             missing_tasks = old_task_ids - new_task_ids
             new_features = new_task_ids - old_task_ids
-            common_tasks = old_task_ids & new_task_ids
+            # 共同tasks只需要数量：旧版本tasks中去掉缺失的即为共同部分，不再单独构建交集
+            common_tasks_count = len(old_task_ids) - len(missing_tasks)
             
-            elapsed = time.time() - start_time
+            elapsed = time.perf_counter() - start_time
             
             result = {
                 'from_version': from_version,
@@ -554,20 +736,21 @@ class VersionComparisonService:
                     'comparison': {
                         'missing_tasks_count': len(missing_tasks),
                         'new_features_count': len(new_features),
-                        'common_tasks_count': len(common_tasks)
+                        'common_tasks_count': common_tasks_count
                     }
                 },
-                'missing_tasks': list(missing_tasks),
-                'new_features': list(new_features),
+                # 排序后输出：顺序稳定，相同版本对的重复请求得到完全一致的响应，便于上游缓存和比对
+                'missing_tasks': sorted(missing_tasks),
+                'new_features': sorted(new_features),
                 'total_time': elapsed
             }
             
-            logger.info(f"✅ 统计信息获取完成，耗时: {elapsed:.2f}s")
+            logger.info("✅ 统计信息获取完成，耗时: %.2fs", elapsed)
             return result
             
         except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"❌ 统计信息获取失败: {e}, 耗时: {elapsed:.2f}s")
+            elapsed = time.perf_counter() - start_time
+            logger.error("❌ 统计信息获取失败: %s, 耗时: %.2fs", e, elapsed)
             return {
                 'from_version': from_version,
                 'to_version': to_version,
@@ -578,14 +761,14 @@ class VersionComparisonService:
 
 class VersionCompareError(Exception):
     """版本比较服务错误"""
-    pass
+    __slots__ = ()
 
 
 class VersionNotFoundError(VersionCompareError):
     """版本未找到错误"""
-    pass
+    __slots__ = ()
 
 
 class GitLabConnectionError(VersionCompareError):
     """GitLab连接错误"""
-    pass 
\ No newline at end of file
+    __slots__ = () 
\ No newline at end of file